@@ -3,21 +3,27 @@ from contextlib import asynccontextmanager
 import httpx
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
-from shared.database import engine
+from shared.database import engine, read_engine
 from shared.logger import get_logger
 from shared.middleware import RouteObfuscationMiddleware
 from shared.kafka_producer import shutdown_executor
 from shared.scheduler import auto_punch_out_and_revoke
 from services.auth_service.server import router as auth_router
+from services.auth_service.tools import ensure_schema as ensure_auth_schema
 from services.ims_service.server import router as ims_router
+from services.ims_service.tools import ensure_schema as ensure_ims_schema
 from services.ims_service.inward_server import router as inward_router
+from services.ims_service.inward_tools import ensure_schema as ensure_inward_schema
 from services.ims_service.interunit_server import router as interunit_router
+from services.ims_service.interunit_tools import ensure_schema as ensure_interunit_schema
 from services.ims_service.transfer_server import router as transfer_router
+from services.ims_service.transfer_tools import ensure_schema as ensure_transfer_schema
 
 logger = get_logger("main")
 
@@ -36,6 +42,11 @@ def keep_alive_ping():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Server starting up")
+    ensure_auth_schema()
+    ensure_ims_schema()
+    ensure_interunit_schema()
+    ensure_inward_schema()
+    ensure_transfer_schema()
 
     # 11 PM IST = 17:30 UTC daily
     scheduler = BackgroundScheduler()
@@ -58,6 +69,8 @@ async def lifespan(app: FastAPI):
     scheduler.shutdown()
     shutdown_executor()
     engine.dispose()
+    if read_engine is not engine:
+        read_engine.dispose()
 
 
 app = FastAPI(
@@ -66,6 +79,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(RouteObfuscationMiddleware)
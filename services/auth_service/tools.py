@@ -4,13 +4,14 @@ from datetime import datetime, date, timedelta
 from email.message import EmailMessage
 
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update, delete, cast, Date
+from sqlalchemy import select, update, delete, cast, Date, text
 
 from shared.models import (
     Promoter, RefreshToken, Attendance, PasswordResetOTP, Product,
     DailySale, DailyStockSummary,
 )
 from shared.config_loader import settings
+from shared.database import engine
 from shared.exceptions import (
     InvalidCredentials, EmailNotFound, InvalidOTP, OTPExpired,
     NoActiveSession,
@@ -44,6 +45,73 @@ def get_tools() -> dict:
     return _registry
 
 
+# created_at is filled by Postgres (see shared/models.py), so the live
+# tables must carry the matching column default
+_CREATED_AT_TABLES = (
+    "promoters",
+    "password_reset_otps",
+    "products",
+    "refresh_tokens",
+    "daily_sales",
+    "daily_stock_summary",
+)
+_TABLES_MISSING_CREATED_AT_DEFAULT = text("""
+    SELECT table_name FROM information_schema.columns
+    WHERE table_schema = current_schema()
+      AND column_name = 'created_at'
+      AND table_name = ANY(:tables)
+      AND column_default IS NULL
+""")
+
+
+# Partial indexes declared in shared/models.py, each paired with the baseline
+# index it supersedes. A pair runs in one transaction, so the old index is
+# only dropped once its replacement exists. Best-effort: queries work without
+# them, so a failure is logged rather than stopping startup.
+_INDEX_DDL = [
+    (
+        """
+        CREATE INDEX IF NOT EXISTS idx_refresh_live_promoter
+        ON refresh_tokens (promoter_id) WHERE is_revoked IS false
+        """,
+        "DROP INDEX IF EXISTS idx_refresh_promoter_active",
+    ),
+    (
+        """
+        CREATE INDEX IF NOT EXISTS idx_attendance_active_by_promoter
+        ON attendance (promoter_id, punch_in_timestamp) WHERE punch_out_timestamp IS NULL
+        """,
+        "DROP INDEX IF EXISTS idx_attendance_active_sessions",
+    ),
+]
+
+
+def ensure_schema() -> None:
+    """Server-side created_at defaults and partial indexes for the promoter tables.
+
+    Inserts omit created_at and the columns are NOT NULL, so a missing
+    default is fatal: this raises rather than letting logins fail later.
+    """
+    with engine.begin() as conn:
+        missing = conn.execute(
+            _TABLES_MISSING_CREATED_AT_DEFAULT,
+            {"tables": list(_CREATED_AT_TABLES)},
+        ).scalars().all()
+        for table in missing:
+            conn.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN created_at SET DEFAULT timezone('utc', now())"
+            ))
+            logger.info(f"Set {table}.created_at default")
+
+    for create, drop in _INDEX_DDL:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(create))
+                conn.execute(text(drop))
+        except Exception as exc:
+            logger.error(f"Auth DDL failed ({create.strip()}): {exc}")
+
+
 @mcp_tool(name="login", description="Authenticate promoter with email and password")
 def login(
     email: str,
@@ -558,7 +626,7 @@ def reset_password(reset_token: str, new_password: str, db: Session) -> dict:
         delete(RefreshToken)
         .where(
             RefreshToken.promoter_id == promoter.id,
-            RefreshToken.is_revoked == False,
+            RefreshToken.is_revoked.is_(False),
         )
     )
 
@@ -7,6 +7,9 @@ logger = get_logger("geocoding.tools")
 
 _BASE_URL = "https://us1.locationiq.com/v1/reverse"
 
+# Shared session so consecutive lookups reuse the keep-alive TLS connection
+_http = requests.Session()
+
 _registry = {}
 
 
@@ -31,7 +34,7 @@ def get_tools() -> dict:
 def reverse_geocode(latitude: float, longitude: float) -> str:
     """Call LocationIQ reverse geocoding API and return the display name."""
     try:
-        response = requests.get(
+        response = _http.get(
             _BASE_URL,
             params={
                 "key": settings.LOCATIONIQ_API_KEY,
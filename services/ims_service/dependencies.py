@@ -1,12 +1,20 @@
+from functools import lru_cache
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
+from jose import jwk, jwt, JWTError
 
 from shared.config_loader import settings
 
 _bearer = HTTPBearer()
 
 
+@lru_cache(maxsize=1)
+def ims_jwt_key():
+    """IMS signing key, constructed once instead of per encode/decode."""
+    return jwk.construct(settings.IMS_JWT_SECRET, settings.IMS_JWT_ALGORITHM)
+
+
 def verify_token(
     credentials: HTTPAuthorizationCredentials = Depends(_bearer),
 ) -> dict:
@@ -14,7 +22,7 @@ def verify_token(
     try:
         payload = jwt.decode(
             credentials.credentials,
-            settings.IMS_JWT_SECRET,
+            ims_jwt_key(),
             algorithms=[settings.IMS_JWT_ALGORITHM],
         )
         return {
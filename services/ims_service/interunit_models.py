@@ -361,7 +361,8 @@ class TransferInListItem(TransferInHeaderResponse):
 
 class TransferInListResponse(BaseModel):
     records: List[TransferInListItem] = []
-    total: int = 0
+    total: Optional[int] = 0
     page: int = 1
     per_page: int = 10
-    total_pages: int = 0
+    total_pages: Optional[int] = 0
+    next_cursor: Optional[str] = None
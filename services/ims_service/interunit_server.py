@@ -159,11 +159,13 @@ def list_transfer_ins_endpoint(
     to_date: Optional[str] = Query(None),
     sort_by: str = Query("created_at"),
     sort_order: str = Query("desc"),
+    exact_count: bool = Query(True),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: Session = Depends(get_db),
 ):
     return list_transfer_ins(
         page, per_page, receiving_warehouse,
-        from_date, to_date, sort_by, sort_order, db,
+        from_date, to_date, sort_by, sort_order, db, exact_count, cursor,
     )
 
 
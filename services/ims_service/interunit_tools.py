@@ -1,10 +1,17 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice
+from typing import Mapping, Optional
 
 from fastapi import HTTPException
-from sqlalchemy import text
+from sqlalchemy import (
+    Boolean, Column, DateTime, Integer, MetaData, Numeric, String, Table,
+    func, insert, text,
+)
 from sqlalchemy.orm import Session
 
+from shared.config_loader import settings
+from shared.database import engine
 from shared.logger import get_logger
 from services.ims_service.interunit_models import (
     RequestCreate, RequestUpdate, TransferCreate, TransferInCreate,
@@ -13,6 +20,126 @@ from services.ims_service.interunit_models import (
 logger = get_logger("ims.interunit")
 
 
+# ── Schema ──
+
+
+_SCHEMA_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_itib_header_id ON interunit_transfer_in_boxes (header_id)",
+    # list_transfer_ins: receiving_warehouse / grn_date filters + sort columns
+    "CREATE INDEX IF NOT EXISTS ix_itih_rw_grn_date"
+    " ON interunit_transfer_in_header (receiving_warehouse, grn_date DESC)",
+    # Default sort + keyset cursor (created_at, id)
+    "CREATE INDEX IF NOT EXISTS ix_itih_created_at_id"
+    " ON interunit_transfer_in_header (created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_itih_grn_date ON interunit_transfer_in_header (grn_date DESC)",
+    # Constrain status to its known domain; NOT VALID skips the full-table check.
+    # box_condition stays free text since the API accepts arbitrary values.
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'chk_itih_status') THEN
+            ALTER TABLE interunit_transfer_in_header
+            ADD CONSTRAINT chk_itih_status
+            CHECK (status IN ('Received', 'Rejected', 'Partial')) NOT VALID;
+        END IF;
+    END $$
+    """,
+)
+
+# create_transfer_in relies on this for ON CONFLICT (grn_number), so unlike
+# _SCHEMA_DDL a failure to build it stops startup. Kept non-partial so the
+# conflict target infers it; NULLs never collide anyway.
+_GRN_UNIQUE_INDEX = text(
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_itih_grn_number ON interunit_transfer_in_header (grn_number)"
+)
+_GRN_UNIQUE_INDEX_EXISTS = text("SELECT to_regclass('uq_itih_grn_number') IS NOT NULL")
+_DUPLICATE_GRNS = text("""
+    SELECT grn_number FROM interunit_transfer_in_header
+    WHERE grn_number IS NOT NULL
+    GROUP BY grn_number HAVING COUNT(*) > 1
+    ORDER BY grn_number
+    LIMIT 20
+""")
+
+
+# (table, column, ADD COLUMN ddl, one-off backfill run only when the column is added)
+_SCHEMA_COLUMNS = (
+    (
+        "interunit_transfer_in_boxes", "transfer_out_box_id",
+        """
+        ALTER TABLE interunit_transfer_in_boxes
+        ADD COLUMN transfer_out_box_id INTEGER
+        REFERENCES interunit_transfer_boxes(id)
+        """,
+        None,
+    ),
+    (
+        "interunit_transfer_in_header", "total_boxes_scanned",
+        """
+        ALTER TABLE interunit_transfer_in_header
+        ADD COLUMN total_boxes_scanned INTEGER NOT NULL DEFAULT 0
+        """,
+        """
+        UPDATE interunit_transfer_in_header h
+        SET total_boxes_scanned = (
+            SELECT COUNT(*) FROM interunit_transfer_in_boxes b WHERE b.header_id = h.id
+        )
+        """,
+    ),
+)
+
+
+def ensure_schema() -> None:
+    """Apply additive interunit DDL once at startup so request paths stay DML-only."""
+    # Request paths read and write these columns, so a failure stops startup
+    for table, column, ddl, backfill in _SCHEMA_COLUMNS:
+        try:
+            with engine.begin() as conn:
+                has_col = conn.execute(
+                    text("""
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_name = :table AND column_name = :column
+                    """),
+                    {"table": table, "column": column},
+                ).scalar()
+                if not has_col:
+                    conn.execute(text(ddl))
+                    if backfill:
+                        conn.execute(text(backfill))
+                    logger.info(f"Added {table}.{column}")
+        except Exception as exc:
+            logger.error(f"Interunit schema check failed for {table}.{column}: {exc}")
+            raise
+
+    # Optional indexes/constraints: one transaction per statement so a single
+    # failure doesn't skip the rest
+    for ddl in _SCHEMA_DDL:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+        except Exception as exc:
+            logger.error(f"Interunit DDL failed ({ddl.strip()}): {exc}")
+
+    _ensure_grn_unique_index()
+
+
+def _ensure_grn_unique_index() -> None:
+    """Build uq_itih_grn_number, refusing to start if existing rows already
+    hold duplicate GRNs (the old check-then-insert path could race)."""
+    with engine.begin() as conn:
+        if conn.execute(_GRN_UNIQUE_INDEX_EXISTS).scalar():
+            return
+        duplicates = conn.execute(_DUPLICATE_GRNS).scalars().all()
+        if duplicates:
+            raise RuntimeError(
+                "interunit_transfer_in_header has duplicate grn_number values "
+                f"({', '.join(duplicates)}); resolve them before starting so "
+                "uq_itih_grn_number can be built"
+            )
+        conn.execute(_GRN_UNIQUE_INDEX)
+        logger.info("Created uq_itih_grn_number")
+
+
 # ── Helpers ──
 
 
@@ -20,8 +147,14 @@ def _generate_request_no() -> str:
     return f"REQ{datetime.now().strftime('%Y%m%d%H%M')}"
 
 
-def _convert_date(date_str: str):
+def _convert_date(date_str: str) -> date:
+    """Parse DD-MM-YYYY into a date bind parameter; slices the canonical layout."""
     try:
+        if len(date_str) == 10 and date_str[2] == "-" and date_str[5] == "-":
+            day, month, year = date_str[:2], date_str[3:5], date_str[6:]
+            if (day + month + year).isdigit():
+                return date(int(year), int(month), int(day))
+        # Non-zero-padded input etc. still goes through strptime
         return datetime.strptime(date_str, "%d-%m-%Y").date()
     except ValueError:
         raise HTTPException(400, "Invalid date format. Use DD-MM-YYYY")
@@ -760,64 +893,217 @@ def delete_transfer(transfer_id: int, db: Session) -> dict:
 # ══════════════════════════════════════════════
 
 
-def _map_transfer_in_header(row) -> dict:
+def _map_transfer_in_header(row: Mapping) -> dict:
+    # Explicit keys: list rows also carry the window total_count and detail
+    # rows the boxes aggregate, neither of which belongs in the header
     return {
-        "id": row.id,
-        "transfer_out_id": row.transfer_out_id,
-        "transfer_out_no": row.transfer_out_no or "",
-        "grn_number": row.grn_number or "",
-        "grn_date": row.grn_date,
-        "receiving_warehouse": row.receiving_warehouse or "",
-        "received_by": row.received_by or "",
-        "received_at": row.received_at,
-        "box_condition": row.box_condition,
-        "condition_remarks": getattr(row, "condition_remarks", None),
-        "status": row.status or "Received",
-        "created_at": row.created_at,
-        "updated_at": row.updated_at,
+        "id": row["id"],
+        "transfer_out_id": row["transfer_out_id"],
+        "transfer_out_no": row["transfer_out_no"] or "",
+        "grn_number": row["grn_number"] or "",
+        "grn_date": row["grn_date"],
+        "receiving_warehouse": row["receiving_warehouse"] or "",
+        "received_by": row["received_by"] or "",
+        "received_at": row["received_at"],
+        "box_condition": row["box_condition"],
+        "condition_remarks": row["condition_remarks"],
+        "status": row["status"] or "Received",
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
     }
 
 
-def _map_transfer_in_box(row) -> dict:
+def _map_transfer_in_box(row: Mapping) -> dict:
+    net_weight = row["net_weight"]
+    gross_weight = row["gross_weight"]
     return {
-        "id": row.id,
-        "header_id": row.header_id,
-        "box_number": row.box_number or "",
-        "transfer_out_box_id": getattr(row, "transfer_out_box_id", None),
-        "article": row.article,
-        "batch_number": row.batch_number,
-        "lot_number": row.lot_number,
-        "transaction_no": row.transaction_no,
-        "net_weight": float(row.net_weight) if row.net_weight is not None else None,
-        "gross_weight": float(row.gross_weight) if row.gross_weight is not None else None,
-        "scanned_at": row.scanned_at,
-        "is_matched": row.is_matched if row.is_matched is not None else True,
+        **row,
+        "box_number": row["box_number"] or "",
+        "net_weight": float(net_weight) if net_weight is not None else None,
+        "gross_weight": float(gross_weight) if gross_weight is not None else None,
+        "is_matched": row["is_matched"] if row["is_matched"] is not None else True,
     }
 
 
-def _fetch_transfer_in_boxes(db: Session, header_id: int) -> list:
-    rows = db.execute(
-        text("""
-            SELECT id, header_id, box_number, article, batch_number,
-                   lot_number, transaction_no, net_weight, gross_weight,
-                   scanned_at, is_matched, transfer_out_box_id
-            FROM interunit_transfer_in_boxes
-            WHERE header_id = :hid
-            ORDER BY scanned_at
-        """),
-        {"hid": header_id},
-    ).fetchall()
-    return [_map_transfer_in_box(r) for r in rows]
+# ── Transfer IN statements (compiled once at import) ──
+
+
+_SET_ASYNC_COMMIT = text("SET LOCAL synchronous_commit = off")
+
+_SELECT_TRANSFER_OUT = text(
+    "SELECT id, challan_no FROM interunit_transfers_header WHERE id = :id"
+)
+
+_SELECT_TRANSFER_IN_BY_OUT = text(
+    "SELECT id FROM interunit_transfer_in_header WHERE transfer_out_id = :toid"
+)
+
+# Header insert and Transfer OUT status flip in one statement; the UPDATE
+# only fires when the INSERT actually produced a row.
+_INSERT_TRANSFER_IN_HEADER = text("""
+    WITH ins AS (
+        INSERT INTO interunit_transfer_in_header
+            (transfer_out_id, transfer_out_no, grn_number, grn_date,
+             receiving_warehouse, received_by, received_at,
+             box_condition, condition_remarks, status, total_boxes_scanned)
+        VALUES
+            (:transfer_out_id, :transfer_out_no, :grn_number, CURRENT_TIMESTAMP,
+             :receiving_warehouse, :received_by, CURRENT_TIMESTAMP,
+             :box_condition, :condition_remarks, 'Received', :total_boxes_scanned)
+        ON CONFLICT (grn_number) DO NOTHING
+        RETURNING id, transfer_out_id, transfer_out_no, grn_number, grn_date,
+                  receiving_warehouse, received_by, received_at,
+                  box_condition, condition_remarks, status,
+                  created_at, updated_at
+    ),
+    upd AS (
+        UPDATE interunit_transfers_header
+        SET status = 'Received'
+        WHERE id = :transfer_out_id AND EXISTS (SELECT 1 FROM ins)
+    )
+    SELECT * FROM ins
+""")
+
+_SELECT_TRANSFER_IN_BY_ID = text("""
+    SELECT h.id, h.transfer_out_id, h.transfer_out_no, h.grn_number,
+           h.grn_date, h.receiving_warehouse, h.received_by, h.received_at,
+           h.box_condition, h.condition_remarks, h.status,
+           h.created_at, h.updated_at,
+           COALESCE(
+               json_agg(
+                   json_build_object(
+                       'id', b.id,
+                       'header_id', b.header_id,
+                       'box_number', COALESCE(b.box_number, ''),
+                       'transfer_out_box_id', b.transfer_out_box_id,
+                       'article', b.article,
+                       'batch_number', b.batch_number,
+                       'lot_number', b.lot_number,
+                       'transaction_no', b.transaction_no,
+                       'net_weight', b.net_weight::float8,
+                       'gross_weight', b.gross_weight::float8,
+                       'scanned_at', b.scanned_at,
+                       'is_matched', COALESCE(b.is_matched, true)
+                   ) ORDER BY b.scanned_at
+               ) FILTER (WHERE b.id IS NOT NULL),
+               '[]'
+           ) AS boxes
+    FROM interunit_transfer_in_header h
+    LEFT JOIN interunit_transfer_in_boxes b ON b.header_id = h.id
+    WHERE h.id = :tid
+    GROUP BY h.id
+""")
+
+
+_transfer_in_boxes = Table(
+    "interunit_transfer_in_boxes",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("header_id", Integer),
+    Column("box_number", String),
+    Column("article", String),
+    Column("batch_number", String),
+    Column("lot_number", String),
+    Column("transaction_no", String),
+    Column("net_weight", Numeric),
+    Column("gross_weight", Numeric),
+    Column("scanned_at", DateTime),
+    Column("is_matched", Boolean),
+    Column("transfer_out_box_id", Integer),
+)
+
+# executemany + RETURNING is batched by SQLAlchemy's insertmanyvalues.
+_INSERT_TRANSFER_IN_BOXES = (
+    insert(_transfer_in_boxes)
+    .values(scanned_at=func.current_timestamp())
+    .returning(*_transfer_in_boxes.c, sort_by_parameter_order=True)
+)
+
+# Max box parameter dicts held in memory per INSERT round trip
+_BOX_INSERT_CHUNK = 500
+
+# Above this many boxes, load via COPY FROM STDIN instead of INSERT
+_BOX_COPY_THRESHOLD = 2000
+
+_COPY_TRANSFER_IN_BOXES = """
+    COPY interunit_transfer_in_boxes
+        (header_id, box_number, article, batch_number, lot_number,
+         transaction_no, net_weight, gross_weight,
+         scanned_at, is_matched, transfer_out_box_id)
+    FROM STDIN
+"""
+
+_SELECT_TRANSFER_IN_BOXES = text("""
+    SELECT id, header_id, box_number, article, batch_number,
+           lot_number, transaction_no, net_weight, gross_weight,
+           scanned_at, is_matched, transfer_out_box_id
+    FROM interunit_transfer_in_boxes
+    WHERE header_id = :hid
+    ORDER BY id
+""")
+
+
+def _copy_transfer_in_boxes(db: Session, header_id: int, scanned_at, scanned_boxes) -> list:
+    """Bulk-load boxes with COPY (no RETURNING), then read them back."""
+    raw = db.connection().connection
+    with raw.cursor() as cur:
+        with cur.copy(_COPY_TRANSFER_IN_BOXES) as copy:
+            for box in scanned_boxes:
+                copy.write_row((
+                    header_id, box.box_number, box.article, box.batch_number,
+                    box.lot_number, box.transaction_no, box.net_weight,
+                    box.gross_weight, scanned_at, box.is_matched,
+                    box.transfer_out_box_id,
+                ))
+    return db.execute(_SELECT_TRANSFER_IN_BOXES, {"hid": header_id}).mappings().all()
+
+
+_TRANSFER_IN_SORT_COLUMNS = frozenset(
+    {"grn_number", "grn_date", "receiving_warehouse", "status", "created_at"}
+)
+_SORT_DIRECTIONS = {"desc": "DESC", "asc": "ASC"}
+
+
+@lru_cache(maxsize=64)
+def _list_transfer_ins_sql(clauses: tuple, sort_by: str, direction: str, with_count: bool):
+    where = " AND ".join(clauses) if clauses else "TRUE"
+    count_col = ",\n            COUNT(*) OVER () AS total_count" if with_count else ""
+    return text(f"""
+        SELECT
+            h.id, h.transfer_out_id, h.transfer_out_no, h.grn_number,
+            h.grn_date, h.receiving_warehouse, h.received_by, h.received_at,
+            h.box_condition, h.condition_remarks, h.status,
+            h.created_at, h.updated_at, h.total_boxes_scanned{count_col}
+        FROM interunit_transfer_in_header h
+        WHERE {where}
+        ORDER BY h.{sort_by} {direction}, h.id {direction}
+        LIMIT :limit OFFSET :offset
+    """)
+
+
+@lru_cache(maxsize=64)
+def _count_transfer_ins_sql(clauses: tuple):
+    where = " AND ".join(clauses) if clauses else "TRUE"
+    return text(f"SELECT COUNT(*) FROM interunit_transfer_in_header h WHERE {where}")
+
+
+_ESTIMATE_TRANSFER_INS = text(
+    "SELECT reltuples::bigint FROM pg_class WHERE relname = 'interunit_transfer_in_header'"
+)
 
 
 # ── Create transfer IN (GRN) ──
 
 
 def create_transfer_in(data: TransferInCreate, db: Session) -> dict:
+    # Everything below runs in the single get_db transaction; optionally skip
+    # the WAL flush wait on its commit.
+    if settings.INTERUNIT_ASYNC_COMMIT:
+        db.execute(_SET_ASYNC_COMMIT)
+
     # Verify Transfer OUT exists
     transfer_out = db.execute(
-        text("SELECT id, challan_no FROM interunit_transfers_header WHERE id = :id"),
-        {"id": data.transfer_out_id},
+        _SELECT_TRANSFER_OUT, {"id": data.transfer_out_id},
     ).fetchone()
 
     if not transfer_out:
@@ -825,38 +1111,16 @@ def create_transfer_in(data: TransferInCreate, db: Session) -> dict:
 
     # Check Transfer OUT not already received
     existing_in = db.execute(
-        text("SELECT id FROM interunit_transfer_in_header WHERE transfer_out_id = :toid"),
-        {"toid": data.transfer_out_id},
+        _SELECT_TRANSFER_IN_BY_OUT, {"toid": data.transfer_out_id},
     ).fetchone()
 
     if existing_in:
         raise HTTPException(400, "Transfer OUT already has a Transfer IN (GRN) record")
 
-    # Check GRN number not duplicate
-    existing_grn = db.execute(
-        text("SELECT id FROM interunit_transfer_in_header WHERE grn_number = :grn"),
-        {"grn": data.grn_number},
-    ).fetchone()
-
-    if existing_grn:
-        raise HTTPException(400, f"GRN number {data.grn_number} already exists")
-
-    # Insert Transfer IN header
+    # Insert Transfer IN header and mark Transfer OUT 'Received'
+    # (GRN uniqueness enforced by uq_itih_grn_number)
     header = db.execute(
-        text("""
-            INSERT INTO interunit_transfer_in_header
-                (transfer_out_id, transfer_out_no, grn_number, grn_date,
-                 receiving_warehouse, received_by, received_at,
-                 box_condition, condition_remarks, status)
-            VALUES
-                (:transfer_out_id, :transfer_out_no, :grn_number, CURRENT_TIMESTAMP,
-                 :receiving_warehouse, :received_by, CURRENT_TIMESTAMP,
-                 :box_condition, :condition_remarks, 'Received')
-            RETURNING id, transfer_out_id, transfer_out_no, grn_number, grn_date,
-                      receiving_warehouse, received_by, received_at,
-                      box_condition, condition_remarks, status,
-                      created_at, updated_at
-        """),
+        _INSERT_TRANSFER_IN_HEADER,
         {
             "transfer_out_id": data.transfer_out_id,
             "transfer_out_no": transfer_out.challan_no,
@@ -865,35 +1129,21 @@ def create_transfer_in(data: TransferInCreate, db: Session) -> dict:
             "received_by": data.received_by,
             "box_condition": data.box_condition,
             "condition_remarks": data.condition_remarks,
+            "total_boxes_scanned": len(data.scanned_boxes),
         },
-    ).fetchone()
+    ).mappings().fetchone()
 
-    header_id = header.id
+    if header is None:
+        raise HTTPException(400, f"GRN number {data.grn_number} already exists")
 
-    # Ensure transfer_out_box_id column exists (idempotent)
-    db.execute(text("""
-        ALTER TABLE interunit_transfer_in_boxes
-        ADD COLUMN IF NOT EXISTS transfer_out_box_id INTEGER
-        REFERENCES interunit_transfer_boxes(id)
-    """))
+    header_id = header["id"]
 
-    # Insert scanned boxes
-    boxes = []
-    for box in data.scanned_boxes:
-        box_row = db.execute(
-            text("""
-                INSERT INTO interunit_transfer_in_boxes
-                    (header_id, box_number, article, batch_number, lot_number,
-                     transaction_no, net_weight, gross_weight,
-                     scanned_at, is_matched, transfer_out_box_id)
-                VALUES
-                    (:header_id, :box_number, :article, :batch_number, :lot_number,
-                     :transaction_no, :net_weight, :gross_weight,
-                     CURRENT_TIMESTAMP, :is_matched, :transfer_out_box_id)
-                RETURNING id, header_id, box_number, article, batch_number,
-                          lot_number, transaction_no, net_weight, gross_weight,
-                          scanned_at, is_matched, transfer_out_box_id
-            """),
+    if len(data.scanned_boxes) > _BOX_COPY_THRESHOLD:
+        # received_at is this transaction's CURRENT_TIMESTAMP, same as the INSERT path
+        boxes = _copy_transfer_in_boxes(db, header_id, header["received_at"], data.scanned_boxes)
+    else:
+        # Insert scanned boxes in bounded chunks (batched INSERT ... RETURNING)
+        box_params = (
             {
                 "header_id": header_id,
                 "box_number": box.box_number,
@@ -905,19 +1155,12 @@ def create_transfer_in(data: TransferInCreate, db: Session) -> dict:
                 "gross_weight": box.gross_weight,
                 "is_matched": box.is_matched,
                 "transfer_out_box_id": box.transfer_out_box_id,
-            },
-        ).fetchone()
-        boxes.append(box_row)
-
-    # Update Transfer OUT status to 'Received'
-    db.execute(
-        text("""
-            UPDATE interunit_transfers_header
-            SET status = 'Received'
-            WHERE id = :toid
-        """),
-        {"toid": data.transfer_out_id},
-    )
+            }
+            for box in data.scanned_boxes
+        )
+        boxes = []
+        while chunk := list(islice(box_params, _BOX_INSERT_CHUNK)):
+            boxes.extend(db.execute(_INSERT_TRANSFER_IN_BOXES, chunk).mappings().all())
 
     result = _map_transfer_in_header(header)
     result["boxes"] = [_map_transfer_in_box(b) for b in boxes]
@@ -937,8 +1180,10 @@ def list_transfer_ins(
     sort_by: str,
     sort_order: str,
     db: Session,
+    exact_count: bool = True,
+    cursor: Optional[str] = None,
 ) -> dict:
-    clauses = ["1=1"]
+    clauses = []
     params: dict = {}
 
     if receiving_warehouse:
@@ -951,52 +1196,62 @@ def list_transfer_ins(
         clauses.append("h.grn_date <= :to_date")
         params["to_date"] = _convert_date(to_date)
 
-    where = " AND ".join(clauses)
-
-    valid_sort = {"grn_number", "grn_date", "receiving_warehouse", "status", "created_at"}
-    if sort_by not in valid_sort:
+    if sort_by not in _TRANSFER_IN_SORT_COLUMNS:
         sort_by = "created_at"
-    direction = "DESC" if sort_order.lower() == "desc" else "ASC"
-
-    total = db.execute(
-        text(f"SELECT COUNT(*) FROM interunit_transfer_in_header h WHERE {where}"),
-        params,
-    ).scalar()
+    direction = _SORT_DIRECTIONS.get(sort_order.lower(), "ASC")
+
+    if cursor:
+        # Keyset mode: seek past (created_at, id) instead of OFFSET; no total.
+        try:
+            cur_ts, cur_id = cursor.rsplit(",", 1)
+            params["cur_ts"] = datetime.fromisoformat(cur_ts)
+            params["cur_id"] = int(cur_id)
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor")
+        clauses.append("(h.created_at, h.id) < (:cur_ts, :cur_id)")
+        sort_by, direction, exact_count, page = "created_at", "DESC", False, 1
 
     offset = (page - 1) * per_page
     params["limit"] = per_page
     params["offset"] = offset
 
     rows = db.execute(
-        text(f"""
-            SELECT
-                h.id, h.transfer_out_id, h.transfer_out_no, h.grn_number,
-                h.grn_date, h.receiving_warehouse, h.received_by, h.received_at,
-                h.box_condition, h.condition_remarks, h.status,
-                h.created_at, h.updated_at,
-                COUNT(b.id) AS total_boxes_scanned
-            FROM interunit_transfer_in_header h
-            LEFT JOIN interunit_transfer_in_boxes b ON h.id = b.header_id
-            WHERE {where}
-            GROUP BY h.id
-            ORDER BY h.{sort_by} {direction}
-            LIMIT :limit OFFSET :offset
-        """),
-        params,
-    ).fetchall()
-
-    records = []
-    for row in rows:
-        item = _map_transfer_in_header(row)
-        item["total_boxes_scanned"] = row.total_boxes_scanned or 0
-        records.append(item)
+        _list_transfer_ins_sql(tuple(clauses), sort_by, direction, exact_count), params,
+    ).mappings().all()
+
+    if cursor:
+        total = None
+    elif not exact_count:
+        # Skip the O(n) count; unfiltered lists fall back to the planner estimate.
+        total = db.execute(_ESTIMATE_TRANSFER_INS).scalar() if not clauses else None
+        if total is not None and total < 0:
+            total = None
+    elif rows:
+        total = rows[0]["total_count"]
+    elif page > 1:
+        # Past the last page the window count is unavailable; count directly.
+        total = db.execute(_count_transfer_ins_sql(tuple(clauses)), params).scalar()
+    else:
+        total = 0
+
+    next_cursor = None
+    last = rows[-1] if len(rows) == per_page else None
+    if sort_by == "created_at" and direction == "DESC" and last and last["created_at"]:
+        next_cursor = f"{last['created_at'].isoformat()},{last['id']}"
 
     return {
-        "records": records,
+        "records": [
+            {**_map_transfer_in_header(row), "total_boxes_scanned": row["total_boxes_scanned"]}
+            for row in rows
+        ],
+        "next_cursor": next_cursor,
         "total": total,
         "page": page,
         "per_page": per_page,
-        "total_pages": (total + per_page - 1) // per_page if total else 0,
+        "total_pages": (
+            None if total is None
+            else (total + per_page - 1) // per_page if total else 0
+        ),
     }
 
 
@@ -1005,23 +1260,14 @@ def list_transfer_ins(
 
 def get_transfer_in(transfer_in_id: int, db: Session) -> dict:
     row = db.execute(
-        text("""
-            SELECT id, transfer_out_id, transfer_out_no, grn_number,
-                   grn_date, receiving_warehouse, received_by, received_at,
-                   box_condition, condition_remarks, status,
-                   created_at, updated_at
-            FROM interunit_transfer_in_header
-            WHERE id = :tid
-        """),
-        {"tid": transfer_in_id},
-    ).fetchone()
+        _SELECT_TRANSFER_IN_BY_ID, {"tid": transfer_in_id},
+    ).mappings().fetchone()
 
     if not row:
         raise HTTPException(404, "Transfer IN not found")
 
-    boxes = _fetch_transfer_in_boxes(db, transfer_in_id)
-
     result = _map_transfer_in_header(row)
-    result["boxes"] = boxes
-    result["total_boxes_scanned"] = len(boxes)
+    # Already shaped like _map_transfer_in_box output by the query
+    result["boxes"] = row["boxes"]
+    result["total_boxes_scanned"] = len(row["boxes"])
     return result
@@ -318,6 +318,7 @@ class SKUDropdownMeta(BaseModel):
     offset: int = 0
     sort: str = "alpha"
     search: Optional[str] = None
+    next_cursor: Optional[dict] = None
 
 
 class SKUDropdownResponse(BaseModel):
@@ -1,9 +1,10 @@
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Query, UploadFile, File
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
-from shared.database import get_db
+from shared.database import get_db, get_read_db
 from services.ims_service.inward_models import (
     Company,
     InwardPayloadFlexible,
@@ -39,10 +40,10 @@ router = APIRouter(prefix="/inward", tags=["inward"])
 
 
 @router.post("/extract-po", response_model=POExtractResponse)
-def extract_po_endpoint(file: UploadFile = File(...)):
+async def extract_po_endpoint(file: UploadFile = File(...)):
     """Upload a PO PDF and extract fields via Claude Sonnet 4.5."""
-    contents = file.file.read()
-    result = extract_po_from_pdf(contents)
+    contents = await file.read()
+    result = await extract_po_from_pdf(contents)
     return POExtractResponse(**result)
 
 
@@ -50,7 +51,7 @@ def extract_po_endpoint(file: UploadFile = File(...)):
 def sku_lookup_endpoint(
     company: Company,
     body: SKULookupRequest,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Lookup SKU details by item description."""
     result = lookup_sku(body.item_description, company, db)
@@ -59,7 +60,11 @@ def sku_lookup_endpoint(
     return SKULookupResponse(**result)
 
 
-@router.get("", response_model=InwardListResponse)
+@router.get(
+    "",
+    response_class=ORJSONResponse,
+    responses={200: {"model": InwardListResponse}},
+)
 def list_inward_records_query(
     company: Company = Query(..., description="Company code"),
     page: int = Query(1, ge=1),
@@ -80,7 +85,7 @@ def list_inward_records_query(
         page = (skip // limit) + 1 if limit > 0 else 1
         per_page = min(limit, 100)
 
-    return list_inward_records(
+    result = list_inward_records(
         company=company,
         page=page,
         per_page=per_page,
@@ -93,6 +98,9 @@ def list_inward_records_query(
         status=status,
         grn_status=grn_status,
     )
+    # Returned directly so FastAPI skips jsonable_encoder; the dict holds
+    # only str/int/float/list values, which orjson serializes natively
+    return ORJSONResponse(result)
 
 
 @router.get("/sku-dropdown", response_model=SKUDropdownResponse)
@@ -105,12 +113,14 @@ def sku_dropdown_endpoint(
     search: Optional[str] = Query(None),
     limit: int = Query(200, ge=1, le=10000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    after_description: Optional[str] = Query(None),
+    after_id: Optional[int] = Query(None),
+    db: Session = Depends(get_read_db),
 ):
     """Cascading SKU dropdown for manual article entry."""
     return sku_dropdown(
         company, material_type, item_category, sub_category,
-        item_description, search, limit, offset, db,
+        item_description, search, limit, offset, after_description, after_id, db,
     )
 
 
@@ -120,10 +130,12 @@ def sku_global_search_endpoint(
     search: Optional[str] = Query(None),
     limit: int = Query(200, ge=1, le=10000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    after_description: Optional[str] = Query(None),
+    after_id: Optional[int] = Query(None),
+    db: Session = Depends(get_read_db),
 ):
     """Global item description search — bypasses hierarchy."""
-    return sku_global_search(company, search, limit, offset, db)
+    return sku_global_search(company, search, limit, offset, after_description, after_id, db)
 
 
 @router.get("/sku-id", response_model=SKUIdResponse)
@@ -133,13 +145,17 @@ def sku_id_endpoint(
     item_category: Optional[str] = Query(None),
     sub_category: Optional[str] = Query(None),
     material_type: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Get SKU ID for a specific item description."""
     return sku_id_lookup(company, item_description, item_category, sub_category, material_type, db)
 
 
-@router.get("/{company}", response_model=InwardListResponse)
+@router.get(
+    "/{company}",
+    response_class=ORJSONResponse,
+    responses={200: {"model": InwardListResponse}},
+)
 def list_inward_records_path(
     company: Company,
     page: int = Query(1, ge=1),
@@ -154,7 +170,7 @@ def list_inward_records_path(
     db: Session = Depends(get_db),
 ):
     """List inward records with comprehensive search and date filtering."""
-    return list_inward_records(
+    result = list_inward_records(
         company=company,
         page=page,
         per_page=per_page,
@@ -167,6 +183,7 @@ def list_inward_records_path(
         status=status,
         grn_status=grn_status,
     )
+    return ORJSONResponse(result)
 
 
 @router.post("", status_code=201)
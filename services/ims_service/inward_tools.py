@@ -1,22 +1,28 @@
+import asyncio
 import base64
-import json
+import hashlib
+import inspect
 import re
+import threading
 import time
+from collections import defaultdict
 from datetime import datetime
-from typing import Optional, List
+from functools import lru_cache, wraps
+from typing import Optional, List, get_args
 
 import anthropic
+import orjson
+from cachetools import TTLCache
 from fastapi import HTTPException
-from sqlalchemy import text, bindparam
+from sqlalchemy import event, text
 from sqlalchemy.orm import Session
 
 from shared.config_loader import settings
+from shared.database import engine
 from shared.logger import get_logger
 from services.ims_service.inward_models import (
     Company,
     InwardPayloadFlexible,
-    InwardListItem,
-    InwardListResponse,
     ApprovalRequest,
     BoxUpsertRequest,
     BoxUpsertResponse,
@@ -34,10 +40,171 @@ from services.ims_service.inward_models import (
 logger = get_logger("ims.inward")
 
 
+# ---------- Schema ----------
+
+
+# Columns matched by the free-text search, per table: (text columns, numeric columns)
+_SEARCH_COLUMNS = {
+    "tx": (
+        (
+            "transaction_no", "vehicle_number", "transporter_name", "lr_number",
+            "vendor_supplier_name", "customer_party_name", "source_location",
+            "destination_location", "challan_number", "invoice_number", "po_number",
+            "grn_number", "purchased_by", "service_invoice_number", "dn_number",
+            "approval_authority", "warehouse", "remark", "currency",
+        ),
+        ("grn_quantity", "total_amount", "tax_amount", "discount_amount", "po_quantity"),
+    ),
+    "art": (
+        (
+            "item_description", "item_category", "sub_category", "material_type",
+            "quality_grade", "uom", "units", "lot_number",
+        ),
+        (
+            "sku_id", "po_weight", "po_quantity", "quantity_units", "net_weight",
+            "total_weight", "unit_rate", "total_amount", "carton_weight",
+        ),
+    ),
+    "box": (
+        ("article_description", "lot_number", "box_id"),
+        ("box_number", "net_weight", "gross_weight", "count"),
+    ),
+}
+
+
+def _search_expr(parts: list) -> str:
+    """One immutable text expression per row; chr(31) keeps matches within a field."""
+    return "(" + " || chr(31) || ".join(parts) + ")"
+
+
+# (text expression, numeric expression) per table. Must stay byte-identical
+# between the index DDL and the query for the planner to match the index.
+_SEARCH_EXPR = {
+    key: (
+        _search_expr([f"COALESCE({c}, '')" for c in text_cols]),
+        _search_expr([f"CAST(COALESCE({c}, 0) AS TEXT)" for c in numeric_cols]),
+    )
+    for key, (text_cols, numeric_cols) in _SEARCH_COLUMNS.items()
+}
+
+# Terms that could match a numeric rendered as text (digits, '.', '-', wildcards)
+_NUMERIC_TERM_RE = re.compile(r"[0-9.\-_%]+")
+
+
+def _search_tsv(text_expr: str) -> str:
+    return f"to_tsvector('simple', {text_expr})"
+
+
+def ensure_schema() -> None:
+    """Create the inward search / SKU lookup indexes and the box_id sequence, for every company."""
+    statements = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
+    # Objects request paths can't work without; these must not fail quietly
+    required = []
+    for company in get_args(Company):
+        tables = table_names(company)
+        for key, (text_expr, numeric_expr) in _SEARCH_EXPR.items():
+            statements += [
+                f"CREATE INDEX IF NOT EXISTS ix_{tables[key]}_search_text_trgm"
+                f" ON {tables[key]} USING gin ({text_expr} gin_trgm_ops)",
+                f"CREATE INDEX IF NOT EXISTS ix_{tables[key]}_search_num_trgm"
+                f" ON {tables[key]} USING gin ({numeric_expr} gin_trgm_ops)",
+                f"CREATE INDEX IF NOT EXISTS ix_{tables[key]}_search_tsv"
+                f" ON {tables[key]} USING gin ({_search_tsv(text_expr)})",
+            ]
+        # SKU dropdown / global search: ILIKE on the description and
+        # case-insensitive equality down the hierarchy
+        sku = tables["sku"]
+        statements += [
+            f"CREATE INDEX IF NOT EXISTS ix_{sku}_item_description_trgm"
+            f" ON {sku} USING gin (item_description gin_trgm_ops)",
+            f"CREATE INDEX IF NOT EXISTS ix_{sku}_hierarchy_upper_desc ON {sku}"
+            " (UPPER(material_type), UPPER(item_category), UPPER(sub_category), item_description, id)",
+            # Keyset order for the unfiltered global search
+            f"CREATE INDEX IF NOT EXISTS ix_{sku}_description_id ON {sku} (item_description, id)",
+        ]
+        # 8-digit prefix for box_ids issued by upsert_box
+        required.append(
+            f"CREATE SEQUENCE IF NOT EXISTS {tables['box']}_box_id_seq MAXVALUE 99999999 CYCLE"
+        )
+
+    # One transaction per statement so a single failure doesn't skip the rest
+    for ddl in statements:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+        except Exception as exc:
+            logger.error(f"Inward DDL failed ({ddl}): {exc}")
+
+    # Raises on failure so startup stops instead of every box upsert 500ing
+    with engine.begin() as conn:
+        for ddl in required:
+            conn.execute(text(ddl))
+
+
+# ---------- Read cache ----------
+
+
+# Short-lived per-process cache for list/detail reads, keyed by company and
+# call arguments. Every inward write clears the company's entries; other
+# workers may serve data up to INWARD_READ_CACHE_TTL seconds old.
+_read_cache: TTLCache = TTLCache(maxsize=1024, ttl=max(settings.INWARD_READ_CACHE_TTL, 1))
+_read_cache_lock = threading.RLock()
+# Bumped on every clear. A read that began before a clear may have seen the
+# pre-write snapshot, so it only stores its result if the generation is
+# unchanged when it finishes.
+_read_cache_gen: dict = defaultdict(int)
+
+
+def _read_cached(op: str):
+    def decorator(fn):
+        sig = inspect.signature(fn)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if settings.INWARD_READ_CACHE_TTL <= 0:
+                return fn(*args, **kwargs)
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (bound.arguments["company"], op) + tuple(
+                v for k, v in bound.arguments.items() if k not in ("company", "db")
+            )
+            company = key[0]
+            with _read_cache_lock:
+                if key in _read_cache:
+                    return _read_cache[key]
+                gen = _read_cache_gen[company]
+            result = fn(*args, **kwargs)
+            with _read_cache_lock:
+                if _read_cache_gen[company] == gen:
+                    _read_cache[key] = result
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _clear_read_cache(company: Company) -> None:
+    with _read_cache_lock:
+        _read_cache_gen[company] += 1
+        for key in [k for k in _read_cache.keys() if k[0] == company]:
+            _read_cache.pop(key, None)
+
+
+def _invalidate_reads(company: Company, db: Session) -> None:
+    """Drop cached reads now and again once the write commits. Each clear
+    bumps the company's generation, so a read that started on the old
+    snapshot and finishes after the commit doesn't store its result."""
+    _clear_read_cache(company)
+    event.listen(db, "after_commit", lambda session: _clear_read_cache(company), once=True)
+
+
 # ---------- Helpers ----------
 
 
+@lru_cache(maxsize=2)
 def table_names(company: Company) -> dict:
+    """Table names per company. Cached and shared, so callers must not mutate it."""
     prefix = "cfpl" if company == "CFPL" else "cdpl"
     return {
         "tx": f"{prefix}_transactions_v2",
@@ -49,21 +216,60 @@ def table_names(company: Company) -> dict:
 
 def generate_box_ids(boxes: List[dict]) -> List[dict]:
     """Assign epoch-based box_id to each box. Last 8 digits of epoch ms + counter."""
-    base = str(int(time.time() * 1000))[-8:]
-    result = []
+    base = int(time.time() * 1000) % 100_000_000
     for i, box in enumerate(boxes, start=1):
-        box["box_id"] = f"{base}-{i}"
-        result.append(box)
-    return result
+        box["box_id"] = f"{base:08d}-{i}"
+    return boxes
+
+
+_CLEAN_DATE_FIELDS = ("system_grn_date", "manufacturing_date", "expiry_date")
 
 
 def clean_date_fields(data: dict) -> dict:
-    """Convert empty strings to None for date fields."""
-    date_fields = ["system_grn_date", "manufacturing_date", "expiry_date"]
-    cleaned = data.copy()
-    for field in date_fields:
-        if field in cleaned and cleaned[field] == "":
-            cleaned[field] = None
+    """Convert empty strings to None for date fields (in place)."""
+    for field in _CLEAN_DATE_FIELDS:
+        if data.get(field) == "":
+            data[field] = None
+    return data
+
+
+_TZ_DATETIME_RE = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}[+-]\d{2}")
+_DATE_PREFIX_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_TIMESTAMP_FORMATS = (
+    "%Y-%m-%d %H:%M:%S%z",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%SZ",
+)
+
+
+@lru_cache(maxsize=4096)
+def _format_date_str(cleaned: str) -> str:
+    """String branch of format_date_for_frontend; list pages repeat the same values."""
+    if _TZ_DATETIME_RE.match(cleaned):
+        try:
+            return cleaned.split(" ")[0]
+        except ValueError:
+            pass
+
+    try:
+        # Pad a trailing "+HH" offset to "+HHMM" for %z
+        plus = cleaned.rfind("+")
+        if plus != -1 and len(cleaned) - plus == 3:
+            cleaned += "00"
+
+        for fmt in _TIMESTAMP_FORMATS:
+            try:
+                return datetime.strptime(cleaned, fmt).strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+    except Exception:
+        pass
+
+    if " " in cleaned and _DATE_PREFIX_RE.match(cleaned):
+        return cleaned.split(" ")[0]
+
     return cleaned
 
 
@@ -75,36 +281,16 @@ def format_date_for_frontend(date_value) -> Optional[str]:
     try:
         if isinstance(date_value, str):
             cleaned = date_value.strip()
-
-            if re.match(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}[+-]\d{2}", cleaned):
-                try:
-                    return cleaned.split(" ")[0]
-                except ValueError:
-                    pass
-
-            try:
-                if "+" in cleaned and len(cleaned.split("+")[1]) == 2:
-                    cleaned = cleaned.replace("+00", "+0000", 1)
-
-                timestamp_formats = [
-                    "%Y-%m-%d %H:%M:%S%z",
-                    "%Y-%m-%d %H:%M:%S",
-                    "%Y-%m-%dT%H:%M:%S%z",
-                    "%Y-%m-%dT%H:%M:%S",
-                    "%Y-%m-%dT%H:%M:%SZ",
-                ]
-                for fmt in timestamp_formats:
-                    try:
-                        return datetime.strptime(cleaned, fmt).strftime("%Y-%m-%d")
-                    except ValueError:
-                        continue
-            except Exception:
-                pass
-
-            if " " in cleaned and re.match(r"\d{4}-\d{2}-\d{2}", cleaned):
-                return cleaned.split(" ")[0]
-
-            return cleaned
+            # Fast path: ISO date, optionally followed by a time part
+            if (
+                len(cleaned) >= 10
+                and cleaned[4] == "-"
+                and cleaned[7] == "-"
+                and cleaned[:4].isdigit()
+                and (len(cleaned) == 10 or cleaned[10] in " T")
+            ):
+                return cleaned[:10]
+            return _format_date_str(cleaned)
 
         elif hasattr(date_value, "strftime"):
             return date_value.strftime("%Y-%m-%d")
@@ -120,14 +306,22 @@ def format_date_for_frontend(date_value) -> Optional[str]:
         return str(date_value) if date_value else None
 
 
+_RECORD_DATE_FIELDS = ("entry_date", "system_grn_date", "manufacturing_date", "expiry_date")
+_MISSING = object()
+
+
 def format_record_dates(record_dict: dict) -> dict:
-    """Format all date fields in a record for frontend consumption."""
-    date_fields = ["entry_date", "system_grn_date", "manufacturing_date", "expiry_date"]
-    formatted = record_dict.copy()
-    for field in date_fields:
-        if field in formatted:
-            formatted[field] = format_date_for_frontend(formatted[field])
-    return formatted
+    """Format all date fields in a record for frontend consumption (in place)."""
+    for field in _RECORD_DATE_FIELDS:
+        value = record_dict.get(field, _MISSING)
+        if value is not _MISSING:
+            record_dict[field] = format_date_for_frontend(value)
+    return record_dict
+
+
+@lru_cache(maxsize=256)
+def _parse_ymd(value: str):
+    return datetime.strptime(value, "%Y-%m-%d").date()
 
 
 def validate_and_normalize_dates(
@@ -138,8 +332,8 @@ def validate_and_normalize_dates(
         return None, None
 
     try:
-        from_dt = datetime.strptime(from_date, "%Y-%m-%d").date() if from_date else None
-        to_dt = datetime.strptime(to_date, "%Y-%m-%d").date() if to_date else None
+        from_dt = _parse_ymd(from_date) if from_date else None
+        to_dt = _parse_ymd(to_date) if to_date else None
 
         if from_dt and to_dt and from_dt > to_dt:
             from_dt, to_dt = to_dt, from_dt
@@ -160,50 +354,25 @@ def build_search_conditions(
     params: dict = {}
 
     if search and search.strip():
-        search_term = f"%{search.strip()}%"
-
-        search_fields = [
-            # Transaction fields
-            "t.transaction_no", "t.vehicle_number", "t.transporter_name",
-            "t.lr_number", "t.vendor_supplier_name", "t.customer_party_name",
-            "t.source_location", "t.destination_location", "t.challan_number",
-            "t.invoice_number", "t.po_number", "t.grn_number", "t.purchased_by",
-            "t.service_invoice_number", "t.dn_number", "t.approval_authority",
-            "t.warehouse", "t.remark", "t.currency",
-            # Article fields
-            "a.item_description", "a.item_category", "a.sub_category",
-            "a.material_type", "a.quality_grade", "a.uom", "a.units",
-            "a.lot_number",
-            # Box fields
-            "b.article_description", "b.lot_number", "b.box_id",
-        ]
-
-        search_conditions = [f"COALESCE({f}, '') ILIKE :search" for f in search_fields]
-
-        numeric_search_conditions = [
-            "CAST(COALESCE(t.grn_quantity, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(t.total_amount, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(t.tax_amount, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(t.discount_amount, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(t.po_quantity, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(a.sku_id, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(a.po_weight, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(a.po_quantity, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(a.quantity_units, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(a.net_weight, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(a.total_weight, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(a.unit_rate, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(a.total_amount, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(a.carton_weight, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(b.box_number, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(b.net_weight, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(b.gross_weight, 0) AS TEXT) ILIKE :search",
-            "CAST(COALESCE(b.count, 0) AS TEXT) ILIKE :search",
-        ]
-
-        all_conditions = search_conditions + numeric_search_conditions
-        where_clauses.append(f"({' OR '.join(all_conditions)})")
-        params["search"] = search_term
+        term = search.strip()
+        # Numerics render as digits/'.'/'-' only, so skip them for any other term
+        numeric = _NUMERIC_TERM_RE.fullmatch(term) is not None
+        # Multi-word terms also match whole words in any order via full-text
+        words = " " in term and "%" not in term and "_" not in term
+        arms = []
+        for key in ("tx", "art", "box"):
+            text_expr, numeric_expr = _SEARCH_EXPR[key]
+            cond = f"{text_expr} ILIKE :search"
+            if numeric:
+                cond += f" OR {numeric_expr} ILIKE :search"
+            if words:
+                cond += f" OR {_search_tsv(text_expr)} @@ plainto_tsquery('simple', :search_words)"
+            arms.append(f"SELECT transaction_no FROM {tables[key]} WHERE {cond}")
+        # Each arm is served by that table's trigram indexes (see ensure_schema)
+        where_clauses.append(f"t.transaction_no IN ({' UNION '.join(arms)})")
+        params["search"] = f"%{term}%"
+        if words:
+            params["search_words"] = term
 
     # Date filtering — uses entry_date (falls back to system_grn_date)
     if from_date or to_date:
@@ -229,6 +398,7 @@ def build_search_conditions(
 # ---------- CRUD ----------
 
 
+@_read_cached("list")
 def list_inward_records(
     company: Company,
     page: int,
@@ -241,7 +411,7 @@ def list_inward_records(
     db: Session,
     status: Optional[str] = None,
     grn_status: Optional[str] = None,
-) -> InwardListResponse:
+) -> dict:
     tables = table_names(company)
 
     normalized_from, normalized_to = validate_and_normalize_dates(from_date, to_date)
@@ -273,30 +443,14 @@ def list_inward_records(
     sort_field = "COALESCE(entry_date, system_grn_date)" if (not sort_by or sort_by == "entry_date") else sort_by
     sort_direction = sort_order or "desc"
 
-    total = db.execute(
-        text(f"""
-            SELECT COUNT(DISTINCT t.transaction_no)
-            FROM {tables['tx']} t
-            LEFT JOIN {tables['art']} a ON t.transaction_no = a.transaction_no
-            LEFT JOIN {tables['box']} b ON t.transaction_no = b.transaction_no
-            WHERE {where_sql}
-        """),
-        params,
-    ).scalar_one()
-
     offset = (page - 1) * per_page
     order_clause = f"{sort_field} {sort_direction.upper()} NULLS LAST, transaction_no DESC"
 
+    # Page the transactions first, then aggregate articles/boxes for just
+    # that page; where_sql only references t (search is a semi-join).
     records = db.execute(
         text(f"""
-            WITH filtered_transactions AS (
-                SELECT DISTINCT t.transaction_no
-                FROM {tables['tx']} t
-                LEFT JOIN {tables['art']} a ON t.transaction_no = a.transaction_no
-                LEFT JOIN {tables['box']} b ON t.transaction_no = b.transaction_no
-                WHERE {where_sql}
-            ),
-            transaction_data AS (
+            WITH page AS (
                 SELECT
                     t.transaction_no,
                     t.entry_date,
@@ -307,79 +461,89 @@ def list_inward_records(
                     t.vendor_supplier_name,
                     t.customer_party_name,
                     t.total_amount,
-                    STRING_AGG(DISTINCT a.item_description, ', ' ORDER BY a.item_description) AS article_descriptions,
-                    STRING_AGG(DISTINCT
-                        CASE
-                            WHEN a.quantity_units IS NOT NULL AND a.uom IS NOT NULL
-                            THEN CONCAT(a.quantity_units::text, ' ', a.uom)
-                            WHEN a.quantity_units IS NOT NULL
-                            THEN a.quantity_units::text
-                            ELSE NULL
-                        END, ', '
-                        ORDER BY CASE
-                            WHEN a.quantity_units IS NOT NULL AND a.uom IS NOT NULL
-                            THEN CONCAT(a.quantity_units::text, ' ', a.uom)
-                            WHEN a.quantity_units IS NOT NULL
-                            THEN a.quantity_units::text
-                            ELSE NULL
-                        END
-                    ) FILTER (WHERE a.quantity_units IS NOT NULL) AS article_quantities,
-                    COUNT(DISTINCT b.box_number) AS box_count,
-                    STRING_AGG(DISTINCT b.article_description, ', ' ORDER BY b.article_description) AS box_descriptions
+                    COUNT(*) OVER () AS total_count
                 FROM {tables['tx']} t
-                INNER JOIN filtered_transactions ft ON t.transaction_no = ft.transaction_no
-                LEFT JOIN {tables['art']} a ON t.transaction_no = a.transaction_no
-                LEFT JOIN {tables['box']} b ON t.transaction_no = b.transaction_no
-                GROUP BY t.transaction_no, t.entry_date, t.system_grn_date, t.status, t.invoice_number, t.po_number, t.vendor_supplier_name, t.customer_party_name, t.total_amount
+                WHERE {where_sql}
+                ORDER BY {order_clause}
+                LIMIT :limit OFFSET :offset
             )
             SELECT
-                transaction_no,
-                COALESCE(entry_date, system_grn_date) AS entry_date,
-                status,
-                invoice_number,
-                po_number,
-                vendor_supplier_name,
-                customer_party_name,
-                total_amount,
-                COALESCE(article_descriptions, box_descriptions) AS item_descriptions_text,
+                p.transaction_no,
+                COALESCE(p.entry_date, p.system_grn_date) AS entry_date,
+                p.status,
+                p.invoice_number,
+                p.po_number,
+                p.vendor_supplier_name,
+                p.customer_party_name,
+                p.total_amount,
+                COALESCE(arts.article_descriptions, bxs.box_descriptions) AS item_descriptions,
                 CASE
-                    WHEN article_quantities IS NOT NULL THEN article_quantities
-                    WHEN box_count > 0 THEN CONCAT(box_count::text, ' BOX')
+                    WHEN arts.article_quantities IS NOT NULL THEN arts.article_quantities
+                    WHEN bxs.box_count > 0 THEN ARRAY[CONCAT(bxs.box_count::text, ' BOX')]
                     ELSE NULL
-                END AS quantities_and_uoms_text
-            FROM transaction_data
+                END AS quantities_and_uoms,
+                p.total_count
+            FROM page p
+            LEFT JOIN LATERAL (
+                SELECT
+                    ARRAY_AGG(DISTINCT a.item_description ORDER BY a.item_description)
+                        FILTER (WHERE a.item_description IS NOT NULL) AS article_descriptions,
+                    ARRAY_AGG(DISTINCT
+                        CASE
+                            WHEN a.uom IS NOT NULL THEN CONCAT(a.quantity_units::text, ' ', a.uom)
+                            ELSE a.quantity_units::text
+                        END
+                        ORDER BY CASE
+                            WHEN a.uom IS NOT NULL THEN CONCAT(a.quantity_units::text, ' ', a.uom)
+                            ELSE a.quantity_units::text
+                        END
+                    ) FILTER (WHERE a.quantity_units IS NOT NULL) AS article_quantities
+                FROM {tables['art']} a
+                WHERE a.transaction_no = p.transaction_no
+            ) arts ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT
+                    COUNT(DISTINCT b.box_number) AS box_count,
+                    ARRAY_AGG(DISTINCT b.article_description ORDER BY b.article_description)
+                        FILTER (WHERE b.article_description IS NOT NULL) AS box_descriptions
+                FROM {tables['box']} b
+                WHERE b.transaction_no = p.transaction_no
+            ) bxs ON TRUE
             ORDER BY {order_clause}
-            LIMIT :limit OFFSET :offset
         """),
         {**params, "limit": per_page, "offset": offset},
     ).fetchall()
 
+    if records:
+        total = records[0].total_count
+    elif page > 1:
+        # Past the last page the window count is unavailable; count directly.
+        total = db.execute(
+            text(f"SELECT COUNT(*) FROM {tables['tx']} t WHERE {where_sql}"),
+            params,
+        ).scalar_one()
+    else:
+        total = 0
+
     formatted = []
     for record in records:
-        item_descriptions = []
-        if record.item_descriptions_text and record.item_descriptions_text.strip():
-            item_descriptions = [d.strip() for d in record.item_descriptions_text.split(",") if d.strip()]
-
-        quantities_and_uoms = []
-        if record.quantities_and_uoms_text and record.quantities_and_uoms_text.strip():
-            quantities_and_uoms = [q.strip() for q in record.quantities_and_uoms_text.split(",") if q.strip()]
-
-        formatted.append(
-            InwardListItem(
-                transaction_no=record.transaction_no or "",
-                entry_date=format_date_for_frontend(record.entry_date) or "",
-                status=record.status or "pending",
-                invoice_number=record.invoice_number,
-                po_number=record.po_number,
-                vendor_supplier_name=record.vendor_supplier_name,
-                customer_party_name=record.customer_party_name,
-                total_amount=float(record.total_amount) if record.total_amount is not None else None,
-                item_descriptions=item_descriptions,
-                quantities_and_uoms=quantities_and_uoms,
-            )
-        )
-
-    return InwardListResponse(records=formatted, total=total, page=page, per_page=per_page)
+        formatted.append({
+            "transaction_no": record.transaction_no or "",
+            "entry_date": format_date_for_frontend(record.entry_date) or "",
+            "status": record.status or "pending",
+            "invoice_number": record.invoice_number,
+            "po_number": record.po_number,
+            "vendor_supplier_name": record.vendor_supplier_name,
+            "customer_party_name": record.customer_party_name,
+            "total_amount": float(record.total_amount) if record.total_amount is not None else None,
+            "item_descriptions": record.item_descriptions or [],
+            "quantities_and_uoms": record.quantities_and_uoms or [],
+        })
+
+    # Plain dict of JSON-native values: the list routes wrap it in an
+    # ORJSONResponse directly, skipping response-model validation and
+    # jsonable_encoder. Shape must stay in line with InwardListResponse.
+    return {"records": formatted, "total": total, "page": page, "per_page": per_page}
 
 
 # Article column list used for INSERT
@@ -397,10 +561,162 @@ _ARTICLE_PARAMS = (
     ":unit_rate, :total_amount, :carton_weight"
 )
 
+_ARTICLE_UPDATE_SET = ", ".join(
+    f"{c} = EXCLUDED.{c}"
+    for c in _ARTICLE_COLUMNS.split(", ")
+    if c not in ("transaction_no", "item_description")
+)
+
+# Fixed per-company statements; {tx}/{art}/{box}/{sku} come from table_names()
+_SQL = {
+    "tx_exists": "SELECT transaction_no, status FROM {tx} WHERE transaction_no = :txno",
+    "tx_insert": """
+        INSERT INTO {tx} (
+            transaction_no, entry_date, vehicle_number, transporter_name, lr_number,
+            vendor_supplier_name, customer_party_name, source_location, destination_location,
+            challan_number, invoice_number, po_number, grn_number, grn_quantity, system_grn_date,
+            purchased_by, service_invoice_number, dn_number, approval_authority,
+            total_amount, tax_amount, discount_amount, po_quantity, remark, currency, status
+        ) VALUES (
+            :transaction_no, :entry_date, :vehicle_number, :transporter_name, :lr_number,
+            :vendor_supplier_name, :customer_party_name, :source_location, :destination_location,
+            :challan_number, :invoice_number, :po_number, :grn_number, :grn_quantity, :system_grn_date,
+            :purchased_by, :service_invoice_number, :dn_number, :approval_authority,
+            :total_amount, :tax_amount, :discount_amount, :po_quantity, :remark, :currency, 'pending'
+        )
+        ON CONFLICT (transaction_no) DO NOTHING
+    """,
+    "art_insert": f"""
+        INSERT INTO {{art}} ({_ARTICLE_COLUMNS})
+        VALUES ({_ARTICLE_PARAMS})
+        ON CONFLICT (transaction_no, item_description) DO NOTHING
+    """,
+    # All boxes in one statement: one array parameter per column, zipped by unnest
+    "box_insert": """
+        INSERT INTO {box} (
+            transaction_no, article_description, box_number, net_weight, gross_weight, lot_number, count
+        )
+        SELECT :transaction_no, u.*
+        FROM unnest(
+            CAST(:article_description AS text[]),
+            CAST(:box_number AS integer[]),
+            CAST(:net_weight AS numeric[]),
+            CAST(:gross_weight AS numeric[]),
+            CAST(:lot_number AS text[]),
+            CAST(:count AS integer[])
+        ) AS u
+        ON CONFLICT (transaction_no, article_description, box_number) DO NOTHING
+    """,
+    # Transaction row plus its articles and boxes as JSON arrays, in one round trip
+    "detail_select": """
+        SELECT
+            t.*,
+            COALESCE((
+                SELECT json_agg(a ORDER BY a.id)
+                FROM (
+                    SELECT a.*, s.material_type AS sku_material_type
+                    FROM {art} a
+                    LEFT JOIN {sku} s ON a.sku_id = s.id
+                    WHERE a.transaction_no = t.transaction_no
+                ) a
+            ), '[]'::json) AS detail_articles,
+            COALESCE((
+                SELECT json_agg(b ORDER BY b.article_description, b.box_number)
+                FROM {box} b
+                WHERE b.transaction_no = t.transaction_no
+            ), '[]'::json) AS detail_boxes
+        FROM {tx} t
+        WHERE t.transaction_no = :txno
+    """,
+    # update_inward: upsert the payload rows, then prune rows no longer sent
+    "art_upsert": f"""
+        INSERT INTO {{art}} ({_ARTICLE_COLUMNS})
+        VALUES ({_ARTICLE_PARAMS})
+        ON CONFLICT (transaction_no, item_description) DO UPDATE SET
+            {_ARTICLE_UPDATE_SET}
+    """,
+    "art_prune": """
+        DELETE FROM {art}
+        WHERE transaction_no = :txno AND item_description <> ALL(CAST(:keep AS text[]))
+    """,
+    "box_upsert": """
+        INSERT INTO {box} (
+            transaction_no, article_description, box_number, net_weight, gross_weight, lot_number, count
+        ) VALUES (
+            :transaction_no, :article_description, :box_number, :net_weight, :gross_weight, :lot_number, :count
+        )
+        ON CONFLICT (transaction_no, article_description, box_number) DO UPDATE SET
+            net_weight = EXCLUDED.net_weight,
+            gross_weight = EXCLUDED.gross_weight,
+            lot_number = EXCLUDED.lot_number,
+            count = EXCLUDED.count
+    """,
+    # upsert_box: an existing box_id is preserved; assigned is true when
+    # the new sequence-based id was used (new row, or existing row that had none)
+    "box_upsert_one": """
+        WITH new_id AS (
+            SELECT to_char(nextval('{box}_box_id_seq'), 'FM00000000') || '-' || :box_num AS box_id
+        )
+        INSERT INTO {box} (
+            transaction_no, article_description, box_number,
+            net_weight, gross_weight, lot_number, count, box_id
+        ) VALUES (
+            :txno, :art_desc, :box_num,
+            :net_weight, :gross_weight, :lot_number, :count, (SELECT box_id FROM new_id)
+        )
+        ON CONFLICT (transaction_no, article_description, box_number) DO UPDATE SET
+            net_weight = EXCLUDED.net_weight,
+            gross_weight = EXCLUDED.gross_weight,
+            lot_number = EXCLUDED.lot_number,
+            count = EXCLUDED.count,
+            box_id = COALESCE(NULLIF({box}.box_id, ''), EXCLUDED.box_id)
+        RETURNING box_id, box_id = (SELECT box_id FROM new_id) AS assigned
+    """,
+    "box_prune": """
+        DELETE FROM {box} b
+        WHERE b.transaction_no = :txno
+          AND NOT EXISTS (
+              SELECT 1
+              FROM unnest(CAST(:keep_desc AS text[]), CAST(:keep_num AS integer[])) AS k(article_description, box_number)
+              WHERE k.article_description = b.article_description AND k.box_number = b.box_number
+          )
+    """,
+    "tx_delete": "DELETE FROM {tx} WHERE transaction_no = :txno",
+    "art_delete": "DELETE FROM {art} WHERE transaction_no = :txno",
+    "box_delete": "DELETE FROM {box} WHERE transaction_no = :txno",
+    # SKU lookups / auto-create
+    "sku_lookup": """
+        SELECT id, item_description, material_type, item_category, sub_category
+        FROM {sku}
+        WHERE item_description ILIKE :desc
+        LIMIT 1
+    """,
+    # Existing SKUs are left untouched; RETURNING lists only the new ones
+    "sku_insert_missing": """
+        INSERT INTO {sku} (id, item_description, item_category, sub_category)
+        SELECT * FROM unnest(
+            CAST(:ids AS bigint[]), CAST(:descs AS text[]),
+            CAST(:cats AS text[]), CAST(:subs AS text[])
+        )
+        ON CONFLICT (id) DO NOTHING
+        RETURNING id, item_description
+    """,
+}
+
+_INSERT_BOX_EDIT_LOG = text("""
+    INSERT INTO box_edit_logs (email_id, description, transaction_no, box_id, field_name, old_value, new_value, edited_at)
+    VALUES (:email_id, :description, :txno, :box_id, :field_name, :old_value, :new_value, :edited_at)
+""")
+
+
+@lru_cache(maxsize=None)
+def _stmt(company: Company, key: str):
+    """Build each fixed statement once per company and reuse the TextClause."""
+    return text(_SQL[key].format(**table_names(company)))
+
 
 def create_inward(payload: InwardPayloadFlexible, db: Session) -> dict:
     t = payload.transaction
-    tables = table_names(payload.company)
     txno = t.transaction_no
 
     if not txno:
@@ -418,95 +734,49 @@ def create_inward(payload: InwardPayloadFlexible, db: Session) -> dict:
     if unknown_refs:
         raise HTTPException(400, f"Boxes reference unknown article(s): {sorted(list(unknown_refs))}")
 
-    _ensure_skus(payload.articles, tables, db)
+    _ensure_skus(payload.articles, payload.company, db)
+    _invalidate_reads(payload.company, db)
 
     # 1) Insert transaction
     tx_data = clean_date_fields(t.model_dump())
-    result = db.execute(
-        text(f"""
-            INSERT INTO {tables['tx']} (
-                transaction_no, entry_date, vehicle_number, transporter_name, lr_number,
-                vendor_supplier_name, customer_party_name, source_location, destination_location,
-                challan_number, invoice_number, po_number, grn_number, grn_quantity, system_grn_date,
-                purchased_by, service_invoice_number, dn_number, approval_authority,
-                total_amount, tax_amount, discount_amount, po_quantity, remark, currency, status
-            ) VALUES (
-                :transaction_no, :entry_date, :vehicle_number, :transporter_name, :lr_number,
-                :vendor_supplier_name, :customer_party_name, :source_location, :destination_location,
-                :challan_number, :invoice_number, :po_number, :grn_number, :grn_quantity, :system_grn_date,
-                :purchased_by, :service_invoice_number, :dn_number, :approval_authority,
-                :total_amount, :tax_amount, :discount_amount, :po_quantity, :remark, :currency, 'pending'
-            )
-            ON CONFLICT (transaction_no) DO NOTHING
-        """),
-        tx_data,
-    )
+    result = db.execute(_stmt(payload.company, "tx_insert"), tx_data)
     if result.rowcount == 0:
         raise HTTPException(409, f"transaction_no '{txno}' already exists")
 
     # 2) Bulk insert articles
     if payload.articles:
         articles_data = [clean_date_fields(a.model_dump()) for a in payload.articles]
-        db.execute(
-            text(f"""
-                INSERT INTO {tables['art']} ({_ARTICLE_COLUMNS})
-                VALUES ({_ARTICLE_PARAMS})
-                ON CONFLICT (transaction_no, item_description) DO NOTHING
-            """),
-            articles_data,
-        )
+        db.execute(_stmt(payload.company, "art_insert"), articles_data)
 
     # 3) Bulk insert boxes (without box_id — assigned later when approver prints)
     if payload.boxes:
-        boxes_data = [b.model_dump() for b in payload.boxes]
+        boxes = payload.boxes
         db.execute(
-            text(f"""
-                INSERT INTO {tables['box']} (
-                    transaction_no, article_description, box_number, net_weight, gross_weight, lot_number, count
-                ) VALUES (
-                    :transaction_no, :article_description, :box_number, :net_weight, :gross_weight, :lot_number, :count
-                )
-                ON CONFLICT (transaction_no, article_description, box_number) DO NOTHING
-            """),
-            boxes_data,
+            _stmt(payload.company, "box_insert"),
+            {
+                "transaction_no": txno,
+                "article_description": [b.article_description for b in boxes],
+                "box_number": [b.box_number for b in boxes],
+                "net_weight": [b.net_weight for b in boxes],
+                "gross_weight": [b.gross_weight for b in boxes],
+                "lot_number": [b.lot_number for b in boxes],
+                "count": [b.count for b in boxes],
+            },
         )
 
     return {"status": "ok", "transaction_no": txno, "company": payload.company}
 
 
+@_read_cached("get")
 def get_inward(company: Company, transaction_no: str, db: Session) -> dict:
-    tables = table_names(company)
-
-    tx_res = db.execute(
-        text(f"SELECT * FROM {tables['tx']} WHERE transaction_no = :txno"),
-        {"txno": transaction_no},
-    ).fetchone()
+    tx_res = db.execute(_stmt(company, "detail_select"), {"txno": transaction_no}).fetchone()
     if not tx_res:
         raise HTTPException(404, f"transaction_no '{transaction_no}' not found for {company}")
 
-    transaction = format_record_dates(dict(tx_res._mapping))
-
-    arts = db.execute(
-        text(f"""
-            SELECT a.*, s.material_type AS sku_material_type
-            FROM {tables['art']} a
-            LEFT JOIN {tables['sku']} s ON a.sku_id = s.id
-            WHERE a.transaction_no = :txno
-            ORDER BY a.id ASC
-        """),
-        {"txno": transaction_no},
-    ).fetchall()
-    articles = [format_record_dates(dict(r._mapping)) for r in arts]
-
-    boxes_res = db.execute(
-        text(f"""
-            SELECT * FROM {tables['box']}
-            WHERE transaction_no = :txno
-            ORDER BY article_description ASC, box_number ASC
-        """),
-        {"txno": transaction_no},
-    ).fetchall()
-    boxes = [dict(r._mapping) for r in boxes_res]
+    transaction = dict(tx_res._mapping)
+    articles = [format_record_dates(a) for a in transaction.pop("detail_articles")]
+    boxes = transaction.pop("detail_boxes")
+    format_record_dates(transaction)
 
     # Synthesize articles from boxes if none exist
     if not articles and boxes:
@@ -564,16 +834,15 @@ def update_inward(
 ) -> dict:
     tables = table_names(company)
 
-    existing = db.execute(
-        text(f"SELECT transaction_no, status FROM {tables['tx']} WHERE transaction_no = :txno"),
-        {"txno": transaction_no},
-    ).fetchone()
+    existing = db.execute(_stmt(company, "tx_exists"), {"txno": transaction_no}).fetchone()
     if not existing:
         raise HTTPException(404, f"Transaction '{transaction_no}' not found")
 
     if payload.transaction.transaction_no != transaction_no:
         raise HTTPException(400, "Transaction number in payload must match URL parameter")
 
+    _invalidate_reads(company, db)
+
     # 1) Update transaction
     tx_data = clean_date_fields(payload.transaction.model_dump())
     tx_update_fields = []
@@ -593,48 +862,28 @@ def update_inward(
             tx_params,
         )
 
-    # 2) Replace articles
-    db.execute(
-        text(f"DELETE FROM {tables['art']} WHERE transaction_no = :txno"),
-        {"txno": transaction_no},
-    )
+    # 2) Upsert articles, then drop the ones no longer in the payload
     if payload.articles:
-        _ensure_skus(payload.articles, tables, db)
+        _ensure_skus(payload.articles, company, db)
         articles_data = [clean_date_fields(a.model_dump()) for a in payload.articles]
-        db.execute(
-            text(f"INSERT INTO {tables['art']} ({_ARTICLE_COLUMNS}) VALUES ({_ARTICLE_PARAMS})"),
-            articles_data,
-        )
+        db.execute(_stmt(company, "art_upsert"), articles_data)
+    db.execute(
+        _stmt(company, "art_prune"),
+        {"txno": transaction_no, "keep": [a.item_description for a in payload.articles]},
+    )
 
-    # 3) Replace boxes — preserve existing box_id for already-printed boxes
-    existing_box_ids = {}
+    # 3) Upsert boxes the same way; box_id is never written, so ids of
+    #    already-printed boxes are preserved
     if payload.boxes:
-        rows = db.execute(
-            text(f"SELECT article_description, box_number, box_id FROM {tables['box']} WHERE transaction_no = :txno AND box_id IS NOT NULL"),
-            {"txno": transaction_no},
-        ).fetchall()
-        existing_box_ids = {(r.article_description, r.box_number): r.box_id for r in rows}
-
+        db.execute(_stmt(company, "box_upsert"), [b.model_dump() for b in payload.boxes])
     db.execute(
-        text(f"DELETE FROM {tables['box']} WHERE transaction_no = :txno"),
-        {"txno": transaction_no},
+        _stmt(company, "box_prune"),
+        {
+            "txno": transaction_no,
+            "keep_desc": [b.article_description for b in payload.boxes],
+            "keep_num": [b.box_number for b in payload.boxes],
+        },
     )
-    if payload.boxes:
-        boxes_data = []
-        for b in payload.boxes:
-            d = b.model_dump()
-            d["box_id"] = existing_box_ids.get((d["article_description"], d["box_number"]))
-            boxes_data.append(d)
-        db.execute(
-            text(f"""
-                INSERT INTO {tables['box']} (
-                    transaction_no, article_description, box_number, net_weight, gross_weight, lot_number, count, box_id
-                ) VALUES (
-                    :transaction_no, :article_description, :box_number, :net_weight, :gross_weight, :lot_number, :count, :box_id
-                )
-            """),
-            boxes_data,
-        )
 
     return {
         "status": "updated",
@@ -646,29 +895,17 @@ def update_inward(
 
 
 def delete_inward(company: Company, transaction_no: str, db: Session) -> dict:
-    tables = table_names(company)
-
-    existing = db.execute(
-        text(f"SELECT transaction_no FROM {tables['tx']} WHERE transaction_no = :txno"),
-        {"txno": transaction_no},
-    ).fetchone()
+    existing = db.execute(_stmt(company, "tx_exists"), {"txno": transaction_no}).fetchone()
     if not existing:
         raise HTTPException(404, f"Transaction '{transaction_no}' not found")
 
-    boxes_deleted = db.execute(
-        text(f"DELETE FROM {tables['box']} WHERE transaction_no = :txno"),
-        {"txno": transaction_no},
-    ).rowcount
+    _invalidate_reads(company, db)
 
-    articles_deleted = db.execute(
-        text(f"DELETE FROM {tables['art']} WHERE transaction_no = :txno"),
-        {"txno": transaction_no},
-    ).rowcount
+    boxes_deleted = db.execute(_stmt(company, "box_delete"), {"txno": transaction_no}).rowcount
 
-    transaction_deleted = db.execute(
-        text(f"DELETE FROM {tables['tx']} WHERE transaction_no = :txno"),
-        {"txno": transaction_no},
-    ).rowcount
+    articles_deleted = db.execute(_stmt(company, "art_delete"), {"txno": transaction_no}).rowcount
+
+    transaction_deleted = db.execute(_stmt(company, "tx_delete"), {"txno": transaction_no}).rowcount
 
     return {
         "status": "deleted",
@@ -690,13 +927,12 @@ def approve_inward(
 ) -> dict:
     tables = table_names(company)
 
-    existing = db.execute(
-        text(f"SELECT transaction_no, status FROM {tables['tx']} WHERE transaction_no = :txno"),
-        {"txno": transaction_no},
-    ).fetchone()
+    existing = db.execute(_stmt(company, "tx_exists"), {"txno": transaction_no}).fetchone()
     if not existing:
         raise HTTPException(404, f"Transaction '{transaction_no}' not found")
 
+    _invalidate_reads(company, db)
+
     now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
     # ---------- APPROVE ----------
@@ -728,72 +964,39 @@ def approve_inward(
         tx_params,
     )
 
-    # 2) Update articles if provided (merge by item_description)
+    # 2) Update articles if provided (merge by item_description). Articles
+    #    that set the same columns share one statement, executed as a batch.
     if payload.articles:
+        art_batches: dict = {}
         for art in payload.articles:
             art_data = clean_date_fields(art.model_dump(exclude_none=True))
             item_desc = art_data.pop("item_description")
-
             if art_data:
-                set_parts = [f"{k} = :{k}" for k in art_data]
+                cols = tuple(art_data)
                 art_data["txno"] = transaction_no
                 art_data["item_desc"] = item_desc
-                db.execute(
-                    text(f"""
-                        UPDATE {tables['art']}
-                        SET {', '.join(set_parts)}
-                        WHERE transaction_no = :txno AND item_description = :item_desc
-                    """),
-                    art_data,
-                )
-
-    # 3) Upsert boxes if provided (preserve existing box_ids from printed boxes)
-    if payload.boxes:
-        for b in payload.boxes:
-            box_params = {
-                "txno": transaction_no,
-                "art_desc": b.article_description,
-                "box_num": b.box_number,
-                "net_weight": b.net_weight,
-                "gross_weight": b.gross_weight,
-                "lot_number": b.lot_number,
-                "count": b.count,
-            }
-            existing = db.execute(
+                art_batches.setdefault(cols, []).append(art_data)
+
+        for cols, rows in art_batches.items():
+            set_parts = [f"{k} = :{k}" for k in cols]
+            db.execute(
                 text(f"""
-                    SELECT box_id FROM {tables['box']}
-                    WHERE transaction_no = :txno
-                      AND article_description = :art_desc AND box_number = :box_num
+                    UPDATE {tables['art']}
+                    SET {', '.join(set_parts)}
+                    WHERE transaction_no = :txno AND item_description = :item_desc
                 """),
-                box_params,
-            ).fetchone()
-
-            if existing:
-                # Update without overwriting box_id
-                db.execute(
-                    text(f"""
-                        UPDATE {tables['box']}
-                        SET net_weight = :net_weight, gross_weight = :gross_weight,
-                            lot_number = :lot_number, count = :count
-                        WHERE transaction_no = :txno
-                          AND article_description = :art_desc AND box_number = :box_num
-                    """),
-                    box_params,
-                )
-            else:
-                # New box — no box_id yet (assigned when approver prints)
-                db.execute(
-                    text(f"""
-                        INSERT INTO {tables['box']} (
-                            transaction_no, article_description, box_number,
-                            net_weight, gross_weight, lot_number, count
-                        ) VALUES (
-                            :txno, :art_desc, :box_num,
-                            :net_weight, :gross_weight, :lot_number, :count
-                        )
-                    """),
-                    box_params,
-                )
+                rows,
+            )
+
+    # 3) Upsert boxes if provided in one batch (same statement as
+    #    update_inward); box_id is never in the SET list, so ids already
+    #    assigned to printed boxes are preserved and new boxes get theirs
+    #    when the approver prints.
+    if payload.boxes:
+        db.execute(
+            _stmt(company, "box_upsert"),
+            [{**b.model_dump(), "transaction_no": transaction_no} for b in payload.boxes],
+        )
 
     return {
         "status": "approved",
@@ -810,86 +1013,27 @@ def approve_inward(
 def upsert_box(
     company: Company, transaction_no: str, payload: BoxUpsertRequest, db: Session
 ) -> BoxUpsertResponse:
-    tables = table_names(company)
-
     # Verify transaction exists
-    existing_tx = db.execute(
-        text(f"SELECT transaction_no FROM {tables['tx']} WHERE transaction_no = :txno"),
-        {"txno": transaction_no},
-    ).fetchone()
+    existing_tx = db.execute(_stmt(company, "tx_exists"), {"txno": transaction_no}).fetchone()
     if not existing_tx:
         raise HTTPException(404, f"Transaction '{transaction_no}' not found")
 
-    # Check if box already exists
-    existing_box = db.execute(
-        text(f"""
-            SELECT id, box_id FROM {tables['box']}
-            WHERE transaction_no = :txno
-              AND article_description = :art_desc
-              AND box_number = :box_num
-        """),
-        {"txno": transaction_no, "art_desc": payload.article_description, "box_num": payload.box_number},
-    ).fetchone()
-
-    params = {
-        "txno": transaction_no,
-        "art_desc": payload.article_description,
-        "box_num": payload.box_number,
-        "net_weight": payload.net_weight,
-        "gross_weight": payload.gross_weight,
-        "lot_number": payload.lot_number,
-        "count": payload.count,
-    }
-
-    if existing_box and existing_box.box_id:
-        # UPDATE existing row, preserve box_id
-        db.execute(
-            text(f"""
-                UPDATE {tables['box']}
-                SET net_weight = :net_weight, gross_weight = :gross_weight,
-                    lot_number = :lot_number, count = :count
-                WHERE transaction_no = :txno
-                  AND article_description = :art_desc AND box_number = :box_num
-            """),
-            params,
-        )
-        box_id = existing_box.box_id
-        status = "updated"
-    else:
-        # Generate new box_id
-        base = str(int(time.time() * 1000))[-8:]
-        box_id = f"{base}-{payload.box_number}"
-        params["box_id"] = box_id
-
-        if existing_box:
-            # Row exists without box_id — update it
-            db.execute(
-                text(f"""
-                    UPDATE {tables['box']}
-                    SET net_weight = :net_weight, gross_weight = :gross_weight,
-                        lot_number = :lot_number, count = :count, box_id = :box_id
-                    WHERE transaction_no = :txno
-                      AND article_description = :art_desc AND box_number = :box_num
-                """),
-                params,
-            )
-        else:
-            # Fresh insert
-            db.execute(
-                text(f"""
-                    INSERT INTO {tables['box']} (
-                        transaction_no, article_description, box_number,
-                        net_weight, gross_weight, lot_number, count, box_id
-                    ) VALUES (
-                        :txno, :art_desc, :box_num,
-                        :net_weight, :gross_weight, :lot_number, :count, :box_id
-                    )
-                """),
-                params,
-            )
-        status = "inserted"
+    _invalidate_reads(company, db)
 
-    db.commit()
+    row = db.execute(
+        _stmt(company, "box_upsert_one"),
+        {
+            "txno": transaction_no,
+            "art_desc": payload.article_description,
+            "box_num": payload.box_number,
+            "net_weight": payload.net_weight,
+            "gross_weight": payload.gross_weight,
+            "lot_number": payload.lot_number,
+            "count": payload.count,
+        },
+    ).one()
+    box_id = row.box_id
+    status = "inserted" if row.assigned else "updated"
 
     return BoxUpsertResponse(
         status=status,
@@ -902,38 +1046,108 @@ def upsert_box(
 
 def log_box_edits(payload: BoxEditLogRequest, db: Session) -> dict:
     now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    for change in payload.changes:
-        description = f"Changed {change.field_name} from '{change.old_value}' to '{change.new_value}'"
-        db.execute(
-            text("""
-                INSERT INTO box_edit_logs (email_id, description, transaction_no, box_id, field_name, old_value, new_value, edited_at)
-                VALUES (:email_id, :description, :txno, :box_id, :field_name, :old_value, :new_value, :edited_at)
-            """),
-            {
-                "email_id": payload.email_id,
-                "description": description,
-                "txno": payload.transaction_no,
-                "box_id": payload.box_id,
-                "field_name": change.field_name,
-                "old_value": change.old_value,
-                "new_value": change.new_value,
-                "edited_at": now,
-            },
-        )
-    db.commit()
+    rows = [
+        {
+            "email_id": payload.email_id,
+            "description": f"Changed {change.field_name} from '{change.old_value}' to '{change.new_value}'",
+            "txno": payload.transaction_no,
+            "box_id": payload.box_id,
+            "field_name": change.field_name,
+            "old_value": change.old_value,
+            "new_value": change.new_value,
+            "edited_at": now,
+        }
+        for change in payload.changes
+    ]
+    if rows:
+        db.execute(_INSERT_BOX_EDIT_LOG, rows)
     return {"status": "logged", "entries": len(payload.changes)}
 
 
 # ---------- PO PDF Extraction ----------
 
 
-def extract_po_from_pdf(file_bytes: bytes) -> dict:
-    """Send PDF to Claude Sonnet 4.5 and extract PO fields."""
-    client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+# Raw JSON of past extractions keyed by SHA-256 of the PDF bytes, so
+# re-uploads of the same file skip the model call.
+_po_extract_cache: TTLCache = TTLCache(maxsize=256, ttl=max(settings.PO_EXTRACT_CACHE_TTL, 1))
+_po_extract_cache_lock = threading.Lock()
+
+_PO_EXTRACT_INSTRUCTIONS = (
+    "Extract the following fields from this Purchase Order PDF and return ONLY valid JSON "
+    "(no markdown, no code fences, no explanation):\n"
+    "{\n"
+    '  "supplier_name": "vendor/supplier name",\n'
+    '  "source_location": "supplier address or city",\n'
+    '  "customer_name": "buyer/customer name",\n'
+    '  "destination_location": "delivery address or city",\n'
+    '  "po_number": "PO number",\n'
+    '  "purchased_by": "indentor or purchaser name",\n'
+    '  "total_amount": numeric or null,\n'
+    '  "tax_amount": numeric or null,\n'
+    '  "discount_amount": numeric or null,\n'
+    '  "po_quantity": total quantity in kgs (numeric or null),\n'
+    '  "currency": "INR" or other currency code,\n'
+    '  "articles": [{"item_description": "description of each line item", "po_weight": weight in kgs (numeric or null), "unit_rate": rate per unit (numeric or null), "total_amount": line total amount (numeric or null)}]\n'
+    "}\n"
+    "If a field is not found, set it to null. Return ONLY the JSON object."
+)
+
+_PO_EXTRACT_ATTEMPTS = 4
+_PO_EXTRACT_BACKOFF = 1.0  # seconds, doubled per retry
+_PO_EXTRACT_RETRYABLE = (
+    anthropic.RateLimitError,
+    anthropic.APIConnectionError,  # includes APITimeoutError
+    anthropic.InternalServerError,
+)
+
+
+# Leading ```/```json fence or trailing ``` fence (not MULTILINE: only the ends)
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+# PDFs above this are base64-encoded in a worker thread, off the event loop
+_PO_INLINE_ENCODE_LIMIT = 1024 * 1024
+
+_po_client: Optional[anthropic.AsyncAnthropic] = None
+
 
-    pdf_b64 = base64.standard_b64encode(file_bytes).decode("utf-8")
+def _get_po_client() -> anthropic.AsyncAnthropic:
+    """Shared async client, so connections are pooled across requests."""
+    global _po_client
+    if _po_client is None:
+        # Backoff is handled by _create_message_with_retry
+        _po_client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY, max_retries=0)
+    return _po_client
 
-    message = client.messages.create(
+
+async def _create_message_with_retry(client: anthropic.AsyncAnthropic, **kwargs):
+    """messages.create with exponential backoff on rate limits, timeouts and 5xx."""
+    for attempt in range(_PO_EXTRACT_ATTEMPTS):
+        try:
+            return await client.messages.create(**kwargs)
+        except _PO_EXTRACT_RETRYABLE as exc:
+            if attempt == _PO_EXTRACT_ATTEMPTS - 1:
+                raise
+            delay = _PO_EXTRACT_BACKOFF * (2 ** attempt)
+            logger.warning(f"PO extraction attempt {attempt + 1} failed ({exc!r}); retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+
+
+async def extract_po_from_pdf(file_bytes: bytes) -> dict:
+    """Send PDF to Claude Sonnet 4.5 and extract PO fields."""
+    cache_key = f"po_extract:v1:{hashlib.sha256(file_bytes).hexdigest()}"
+    if settings.PO_EXTRACT_CACHE_TTL > 0:
+        with _po_extract_cache_lock:
+            cached = _po_extract_cache.get(cache_key)
+        if cached is not None:
+            return orjson.loads(cached)
+
+    if len(file_bytes) > _PO_INLINE_ENCODE_LIMIT:
+        pdf_b64 = (await asyncio.to_thread(base64.standard_b64encode, file_bytes)).decode("ascii")
+    else:
+        pdf_b64 = base64.standard_b64encode(file_bytes).decode("ascii")
+
+    message = await _create_message_with_retry(
+        _get_po_client(),
         model="claude-sonnet-4-5-20250929",
         max_tokens=2048,
         messages=[
@@ -948,28 +1162,7 @@ def extract_po_from_pdf(file_bytes: bytes) -> dict:
                             "data": pdf_b64,
                         },
                     },
-                    {
-                        "type": "text",
-                        "text": (
-                            "Extract the following fields from this Purchase Order PDF and return ONLY valid JSON "
-                            "(no markdown, no code fences, no explanation):\n"
-                            "{\n"
-                            '  "supplier_name": "vendor/supplier name",\n'
-                            '  "source_location": "supplier address or city",\n'
-                            '  "customer_name": "buyer/customer name",\n'
-                            '  "destination_location": "delivery address or city",\n'
-                            '  "po_number": "PO number",\n'
-                            '  "purchased_by": "indentor or purchaser name",\n'
-                            '  "total_amount": numeric or null,\n'
-                            '  "tax_amount": numeric or null,\n'
-                            '  "discount_amount": numeric or null,\n'
-                            '  "po_quantity": total quantity in kgs (numeric or null),\n'
-                            '  "currency": "INR" or other currency code,\n'
-                            '  "articles": [{"item_description": "description of each line item", "po_weight": weight in kgs (numeric or null), "unit_rate": rate per unit (numeric or null), "total_amount": line total amount (numeric or null)}]\n'
-                            "}\n"
-                            "If a field is not found, set it to null. Return ONLY the JSON object."
-                        ),
-                    },
+                    {"type": "text", "text": _PO_EXTRACT_INSTRUCTIONS},
                 ],
             }
         ],
@@ -979,32 +1172,26 @@ def extract_po_from_pdf(file_bytes: bytes) -> dict:
 
     # Strip markdown fences if present
     if raw_text.startswith("```"):
-        raw_text = re.sub(r"^```(?:json)?\s*", "", raw_text)
-        raw_text = re.sub(r"\s*```$", "", raw_text)
+        raw_text = _FENCE_RE.sub("", raw_text)
 
     try:
-        return json.loads(raw_text)
-    except json.JSONDecodeError:
+        result = orjson.loads(raw_text)
+    except orjson.JSONDecodeError:
         logger.error(f"Claude returned invalid JSON: {raw_text}")
         raise HTTPException(422, "Failed to parse extraction result from Claude")
 
+    if settings.PO_EXTRACT_CACHE_TTL > 0:
+        with _po_extract_cache_lock:
+            _po_extract_cache[cache_key] = raw_text
+    return result
+
 
 # ---------- SKU Lookup ----------
 
 
 def lookup_sku(item_description: str, company: Company, db: Session) -> dict | None:
     """Lookup SKU by item_description and return sku_id, material_type, item_category, sub_category."""
-    tables = table_names(company)
-
-    row = db.execute(
-        text(f"""
-            SELECT id, item_description, material_type, item_category, sub_category
-            FROM {tables['sku']}
-            WHERE item_description ILIKE :desc
-            LIMIT 1
-        """),
-        {"desc": item_description},
-    ).mappings().first()
+    row = db.execute(_stmt(company, "sku_lookup"), {"desc": item_description}).mappings().first()
 
     if not row:
         return None
@@ -1021,42 +1208,137 @@ def lookup_sku(item_description: str, company: Company, db: Session) -> dict | N
 # ---------- Internal helpers ----------
 
 
-def _ensure_skus(articles, tables: dict, db: Session) -> None:
+def _ensure_skus(articles, company: Company, db: Session) -> None:
     """Auto-create missing SKUs in the sku table."""
-    sku_ids = {a.sku_id for a in articles if a.sku_id is not None}
-    if not sku_ids:
+    # First article per sku_id supplies the description/category
+    by_id: dict = {}
+    for a in articles:
+        if a.sku_id is not None:
+            by_id.setdefault(a.sku_id, a)
+    if not by_id:
         return
 
-    sku_sql = text(f"SELECT id FROM {tables['sku']} WHERE id IN :ids").bindparams(
-        bindparam("ids", expanding=True)
-    )
-    found = {row[0] for row in db.execute(sku_sql, {"ids": list(sku_ids)})}
-    missing = sku_ids - found
-
-    for missing_id in missing:
-        article = next(a for a in articles if a.sku_id == missing_id)
-        db.execute(
-            text(f"""
-                INSERT INTO {tables['sku']} (id, item_description, item_category, sub_category)
-                VALUES (:id, :item_description, :item_category, :sub_category)
-                ON CONFLICT (id) DO UPDATE SET
-                    item_description = EXCLUDED.item_description,
-                    item_category = EXCLUDED.item_category,
-                    sub_category = EXCLUDED.sub_category
-            """),
-            {
-                "id": missing_id,
-                "item_description": article.item_description,
-                "item_category": article.item_category or "",
-                "sub_category": article.sub_category or "",
-            },
-        )
-        logger.info(f"Auto-created SKU {missing_id} for item: {article.item_description}")
+    created = db.execute(
+        _stmt(company, "sku_insert_missing"),
+        {
+            "ids": list(by_id),
+            "descs": [a.item_description for a in by_id.values()],
+            "cats": [a.item_category or "" for a in by_id.values()],
+            "subs": [a.sub_category or "" for a in by_id.values()],
+        },
+    ).fetchall()
+    for sku_id, item_description in created:
+        logger.info(f"Auto-created SKU {sku_id} for item: {item_description}")
+    if created:
+        _invalidate_sku_facets(company, db)
 
 
 # ---------- SKU Dropdown / Search / ID ----------
 
 
+# Material type / category / sub category lists, keyed by (company, facet,
+# upper-cased parent filters). New SKUs from _ensure_skus clear the
+# company's entries; other workers may lag by up to SKU_FACET_CACHE_TTL.
+_facet_cache: TTLCache = TTLCache(maxsize=1024, ttl=max(settings.SKU_FACET_CACHE_TTL, 1))
+_facet_cache_lock = threading.Lock()
+
+
+def _clear_sku_facets(company: Company) -> None:
+    with _facet_cache_lock:
+        for key in [k for k in _facet_cache.keys() if k[0] == company]:
+            _facet_cache.pop(key, None)
+
+
+def _invalidate_sku_facets(company: Company, db: Session) -> None:
+    _clear_sku_facets(company)
+    event.listen(db, "after_commit", lambda session: _clear_sku_facets(company), once=True)
+
+
+def _strip(value: Optional[str]) -> Optional[str]:
+    return value.strip() if value else None
+
+
+def _is_other(value: Optional[str]) -> bool:
+    return bool(value) and value.strip().lower() == "other"
+
+
+def _next_cursor(descriptions: list, ids: list, limit: int) -> Optional[dict]:
+    """Keyset cursor for the page after a full one; None on the last page."""
+    if not ids or len(ids) < limit:
+        return None
+    return {"after_description": descriptions[-1], "after_id": ids[-1]}
+
+
+@lru_cache(maxsize=64)
+def _sku_dropdown_sql(
+    company: Company,
+    facets: tuple,
+    with_items: bool,
+    with_search: bool,
+    with_after: bool,
+    with_resolve: bool,
+):
+    """One SELECT for the dropdown cascade; only the requested facets and levels are included."""
+    tbl = table_names(company)["sku"]
+    cols = []
+    if "material_types" in facets:
+        cols.append(f"""
+        ARRAY(
+            SELECT DISTINCT material_type FROM {tbl}
+            WHERE material_type IS NOT NULL
+            ORDER BY material_type ASC
+        ) AS material_types""")
+    if "item_categories" in facets:
+        cols.append(f"""
+        ARRAY(
+            SELECT DISTINCT item_category FROM {tbl}
+            WHERE UPPER(material_type) = UPPER(:mt) AND item_category IS NOT NULL
+            ORDER BY item_category ASC
+        ) AS item_categories""")
+    if "sub_categories" in facets:
+        cols.append(f"""
+        ARRAY(
+            SELECT DISTINCT sub_category FROM {tbl}
+            WHERE UPPER(material_type) = UPPER(:mt)
+              AND UPPER(item_category) = UPPER(:ic)
+              AND sub_category IS NOT NULL
+            ORDER BY sub_category ASC
+        ) AS sub_categories""")
+
+    with_sql = ""
+    if with_items:
+        where_sql = (
+            "UPPER(material_type) = UPPER(:mt)"
+            " AND UPPER(item_category) = UPPER(:ic)"
+            " AND UPPER(sub_category) = UPPER(:sc)"
+        )
+        if with_search:
+            where_sql += " AND item_description ILIKE :search"
+        # Keyset continuation; the count below stays over the whole filter
+        after_sql = " AND (item_description, id) > (:after_desc, :after_id)" if with_after else ""
+        with_sql = f"""
+        WITH page AS (
+            SELECT id, item_description FROM {tbl}
+            WHERE {where_sql}{after_sql} AND item_description IS NOT NULL
+            ORDER BY item_description ASC, id ASC
+            LIMIT :limit OFFSET :offset
+        )"""
+        cols += [
+            "ARRAY(SELECT id FROM page ORDER BY item_description ASC, id ASC) AS item_ids",
+            "ARRAY(SELECT item_description FROM page ORDER BY item_description ASC, id ASC) AS item_descs",
+            f"(SELECT COUNT(DISTINCT item_description) FROM {tbl} WHERE {where_sql}) AS total_item_descriptions",
+        ]
+    if with_resolve:
+        cols.append(f"""
+        (
+            SELECT ARRAY[material_type, item_category, sub_category] FROM {tbl}
+            WHERE item_description = :desc
+            LIMIT 1
+        ) AS resolved""")
+
+    return text(f"{with_sql}\n        SELECT " + ",\n        ".join(cols))
+
+
 def sku_dropdown(
     company: Company,
     material_type: Optional[str],
@@ -1066,104 +1348,76 @@ def sku_dropdown(
     search: Optional[str],
     limit: int,
     offset: int,
+    after_description: Optional[str],
+    after_id: Optional[int],
     db: Session,
 ) -> SKUDropdownResponse:
     """Cascading SKU dropdown: material_type -> item_category -> sub_category -> item_description."""
-    tbl = table_names(company)["sku"]
-
-    material_type = material_type.strip() if material_type else None
-    item_category = item_category.strip() if item_category else None
-    sub_category = sub_category.strip() if sub_category else None
-    item_description = item_description.strip() if item_description else None
-    search = search.strip() if search else None
-
-    # 1) All material types (unfiltered)
-    material_types = db.execute(
-        text(f"""
-            SELECT DISTINCT material_type FROM {tbl}
-            WHERE material_type IS NOT NULL
-            ORDER BY material_type ASC
-        """)
-    ).scalars().all()
+    material_type = _strip(material_type)
+    item_category = _strip(item_category)
+    sub_category = _strip(sub_category)
+    item_description = _strip(item_description)
+    search = _strip(search)
+
+    has_items = bool(material_type and item_category and sub_category)
+    has_after = after_description is not None and after_id is not None
+    params: dict = {"mt": material_type, "ic": item_category, "sc": sub_category, "desc": item_description}
+    if has_items:
+        # A cursor replaces the offset
+        params.update(limit=limit, offset=0 if has_after else offset)
+        if search:
+            params["search"] = f"%{search}%"
+        if has_after:
+            params.update(after_desc=after_description, after_id=after_id)
 
-    # 2) Item categories (filtered by material_type)
-    item_categories = []
+    facet_keys = {"material_types": (company, "material_types")}
     if material_type:
-        item_categories = db.execute(
-            text(f"""
-                SELECT DISTINCT item_category FROM {tbl}
-                WHERE UPPER(material_type) = UPPER(:mt) AND item_category IS NOT NULL
-                ORDER BY item_category ASC
-            """),
-            {"mt": material_type},
-        ).scalars().all()
-
-    # 3) Sub categories (filtered by material_type + item_category)
-    sub_categories = []
+        facet_keys["item_categories"] = (company, "item_categories", material_type.upper())
     if material_type and item_category:
-        sub_categories = db.execute(
-            text(f"""
-                SELECT DISTINCT sub_category FROM {tbl}
-                WHERE UPPER(material_type) = UPPER(:mt)
-                  AND UPPER(item_category) = UPPER(:ic)
-                  AND sub_category IS NOT NULL
-                ORDER BY sub_category ASC
-            """),
-            {"mt": material_type, "ic": item_category},
-        ).scalars().all()
-
-    # 4) Item descriptions + IDs (filtered by full hierarchy)
-    item_descs: list[str] = []
-    item_ids: list[int] = []
-    total_item_descriptions = 0
-
-    if material_type and item_category and sub_category:
-        where = [
-            "UPPER(material_type) = UPPER(:mt)",
-            "UPPER(item_category) = UPPER(:ic)",
-            "UPPER(sub_category) = UPPER(:sc)",
-        ]
-        params: dict = {"mt": material_type, "ic": item_category, "sc": sub_category}
-
-        if search:
-            where.append("LOWER(item_description) LIKE :search")
-            params["search"] = f"%{search.lower()}%"
-
-        where_sql = " AND ".join(where)
-
-        total_item_descriptions = db.execute(
-            text(f"SELECT COUNT(DISTINCT item_description) FROM {tbl} WHERE {where_sql}"),
+        facet_keys["sub_categories"] = (
+            company, "sub_categories", material_type.upper(), item_category.upper()
+        )
+    facets: dict = {}
+    if settings.SKU_FACET_CACHE_TTL > 0:
+        with _facet_cache_lock:
+            for name, key in facet_keys.items():
+                if key in _facet_cache:
+                    facets[name] = _facet_cache[key]
+    missing = tuple(name for name in facet_keys if name not in facets)
+
+    # Everything not cached, in one round trip
+    row: dict = {}
+    if missing or has_items or item_description:
+        row = db.execute(
+            _sku_dropdown_sql(
+                company,
+                missing,
+                has_items,
+                bool(has_items and search),
+                bool(has_items and has_after),
+                bool(item_description),
+            ),
             params,
-        ).scalar_one()
-
-        rows = db.execute(
-            text(f"""
-                SELECT DISTINCT id, item_description FROM {tbl}
-                WHERE {where_sql} AND item_description IS NOT NULL
-                ORDER BY item_description ASC
-                LIMIT :limit OFFSET :offset
-            """),
-            {**params, "limit": limit, "offset": offset},
-        ).fetchall()
-
-        item_ids = [r[0] for r in rows]
-        item_descs = [r[1] for r in rows]
+        ).mappings().one()
+        if missing:
+            fetched = {name: row[name] for name in missing}
+            facets.update(fetched)
+            if settings.SKU_FACET_CACHE_TTL > 0:
+                with _facet_cache_lock:
+                    for name, values in fetched.items():
+                        _facet_cache[facet_keys[name]] = values
+
+    material_types = facets["material_types"]
+    item_categories = facets.get("item_categories", [])
+    sub_categories = facets.get("sub_categories", [])
+    item_ids: list[int] = row.get("item_ids", [])
+    item_descs: list[str] = row.get("item_descs", [])
+    total_item_descriptions = row.get("total_item_descriptions", 0)
 
-    # 5) Auto-resolve from item_description
     resolved = SKUResolvedFromItem()
-    if item_description:
-        row = db.execute(
-            text(f"""
-                SELECT material_type, item_category, sub_category FROM {tbl}
-                WHERE item_description = :desc
-                LIMIT 1
-            """),
-            {"desc": item_description},
-        ).fetchone()
-        if row:
-            resolved = SKUResolvedFromItem(
-                material_type=row[0], item_category=row[1], sub_category=row[2]
-            )
+    if row.get("resolved"):
+        mt, ic, sc = row["resolved"]
+        resolved = SKUResolvedFromItem(material_type=mt, item_category=ic, sub_category=sc)
 
     return SKUDropdownResponse(
         company=company,
@@ -1190,6 +1444,7 @@ def sku_dropdown(
             offset=offset,
             sort="alpha",
             search=search,
+            next_cursor=_next_cursor(item_descs, item_ids, limit),
         ),
     )
 
@@ -1199,37 +1454,52 @@ def sku_global_search(
     search: Optional[str],
     limit: int,
     offset: int,
+    after_description: Optional[str],
+    after_id: Optional[int],
     db: Session,
 ) -> SKUGlobalSearchResponse:
     """Global item description search — bypasses hierarchy."""
     tbl = table_names(company)["sku"]
-    search_term = search.strip() if search else None
+    search_term = _strip(search)
 
     where_clauses = ["1=1"]
     params: dict = {}
 
     if search_term:
-        where_clauses.append("LOWER(item_description) LIKE :search")
-        params["search"] = f"%{search_term.lower()}%"
+        where_clauses.append("item_description ILIKE :search")
+        params["search"] = f"%{search_term}%"
 
     where_sql = " AND ".join(where_clauses)
+    count_sql = f"SELECT COUNT(DISTINCT item_description) FROM {tbl} WHERE {where_sql}"
 
-    total_items = db.execute(
-        text(f"SELECT COUNT(DISTINCT item_description) FROM {tbl} WHERE {where_sql}"),
-        params,
-    ).scalar_one()
+    # Keyset continuation when a cursor is given, otherwise offset paging
+    page_sql = where_sql
+    page_params = {**params, "limit": limit, "offset": offset}
+    has_after = after_description is not None and after_id is not None
+    if has_after:
+        page_sql += " AND (item_description, id) > (:after_desc, :after_id)"
+        page_params.update(offset=0, after_desc=after_description, after_id=after_id)
 
     rows = db.execute(
         text(f"""
-            SELECT DISTINCT id, item_description, material_type, item_category, sub_category
+            SELECT id, item_description, material_type, item_category, sub_category,
+                   ({count_sql}) AS total_count
             FROM {tbl}
-            WHERE {where_sql}
-            ORDER BY item_description ASC
+            WHERE {page_sql}
+            ORDER BY item_description ASC, id ASC
             LIMIT :limit OFFSET :offset
         """),
-        {**params, "limit": limit, "offset": offset},
+        page_params,
     ).fetchall()
 
+    if rows:
+        total_items = rows[0].total_count
+    elif offset or has_after:
+        # Past the last page: the total still has to come from somewhere
+        total_items = db.execute(text(count_sql), params).scalar_one()
+    else:
+        total_items = 0
+
     items = [
         SKUGlobalSearchItem(
             id=r[0],
@@ -1241,6 +1511,7 @@ def sku_global_search(
         for r in rows
     ]
 
+    next_cursor = _next_cursor([r[1] for r in rows], [r[0] for r in rows], limit)
     return SKUGlobalSearchResponse(
         company=company,
         items=items,
@@ -1249,7 +1520,8 @@ def sku_global_search(
             "limit": limit,
             "offset": offset,
             "search": search_term,
-            "has_more": (offset + limit) < total_items,
+            "has_more": next_cursor is not None if has_after else (offset + limit) < total_items,
+            "next_cursor": next_cursor,
         },
     )
 
@@ -1266,8 +1538,12 @@ def sku_id_lookup(
     tbl = table_names(company)["sku"]
 
     # Handle "other" in any field — return null sku_id
-    fields = [item_description, item_category, sub_category, material_type]
-    if any(f and f.strip().lower() == "other" for f in fields):
+    if (
+        _is_other(item_description)
+        or _is_other(item_category)
+        or _is_other(sub_category)
+        or _is_other(material_type)
+    ):
         return SKUIdResponse(
             sku_id=None,
             id=None,
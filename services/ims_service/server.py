@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from shared.database import get_db
@@ -32,7 +32,7 @@ def login_endpoint(body: LoginRequest, db: Session = Depends(get_db)):
 
 @router.get("/users")
 def list_users_endpoint(db: Session = Depends(get_db)):
-    return list_users(db)
+    return Response(content=list_users(db), media_type="application/json")
 
 
 @router.post("/users", status_code=201)
@@ -1,35 +1,135 @@
-from datetime import datetime, timedelta
+import secrets
+import threading
+import time
+from functools import lru_cache
 
 import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from cachetools import TTLCache
 from jose import jwt
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from shared.config_loader import settings
+from shared.database import engine
 from shared.logger import get_logger
+from services.ims_service.dependencies import ims_jwt_key
 
 logger = get_logger("ims.tools")
 
+# New hashes are argon2id; legacy bcrypt ($2b$...) hashes still verify and
+# are upgraded on the next successful login.
+_PH = PasswordHasher(time_cost=3, memory_cost=64 * 1024, parallelism=2)
+
+# Per-process caches of company roles (keyed by user_id) and permission
+# checks (keyed by (user_id, company, module, action)). Local user updates
+# and deletes clear the user's entries.
+_companies_cache: TTLCache = TTLCache(maxsize=4096, ttl=max(settings.IMS_ACCESS_CACHE_TTL, 1))
+_permission_cache: TTLCache = TTLCache(maxsize=16384, ttl=max(settings.IMS_ACCESS_CACHE_TTL, 1))
+_access_cache_lock = threading.Lock()
+
+
+def _invalidate_user_access(user_id: str) -> None:
+    with _access_cache_lock:
+        _companies_cache.pop(user_id, None)
+        for key in [k for k in _permission_cache.keys() if k[0] == user_id]:
+            _permission_cache.pop(key, None)
+
+
+_SCHEMA_DDL = [
+    # Covering index for check_permission / dashboard module permission lookups
+    """
+    CREATE INDEX IF NOT EXISTS idx_mp_lookup
+    ON module_permissions (user_id, company_code, module_code)
+    INCLUDE (can_access, can_view, can_create, can_edit, can_delete, can_approve)
+    """,
+    # Expression index on role precedence so company lists come back in
+    # index order. The CASE must stay identical to the ORDER BY in
+    # _SELECT_USER_COMPANIES / _SELECT_CURRENT_USER; without the index
+    # those queries still work, they just sort.
+    """
+    CREATE INDEX IF NOT EXISTS idx_ucr_user_role_order
+    ON user_company_roles (
+        user_id,
+        (CASE role
+            WHEN 'developer' THEN 6
+            WHEN 'admin'     THEN 5
+            WHEN 'ops'       THEN 4
+            WHEN 'approver'  THEN 3
+            WHEN 'viewer'    THEN 2
+            ELSE 1
+        END) DESC,
+        company_code
+    )
+    INCLUDE (role)
+    """,
+]
+
+
+def ensure_schema() -> None:
+    """Permission lookup and role-order indexes; best-effort, since no
+    request path depends on them for correctness."""
+    for ddl in _SCHEMA_DDL:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+        except Exception as exc:
+            logger.error(f"IMS DDL failed ({ddl.strip()}): {exc}")
+
 
 def _create_access_token(user_id: str, email: str) -> str:
+    now = int(time.time())
     payload = {
         "user_id": user_id,
         "email": email,
-        "exp": datetime.utcnow() + timedelta(hours=settings.IMS_JWT_EXPIRATION_HOURS),
-        "iat": datetime.utcnow(),
+        "exp": now + settings.IMS_JWT_EXPIRATION_HOURS * 3600,
+        "iat": now,
     }
-    return jwt.encode(payload, settings.IMS_JWT_SECRET, algorithm=settings.IMS_JWT_ALGORITHM)
+    return jwt.encode(payload, ims_jwt_key(), algorithm=settings.IMS_JWT_ALGORITHM)
 
 
 def _hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return _PH.hash(password)
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    """Throwaway hash verified on login misses so they cost the same as a
+    wrong password. bcrypt, not argon2: it is the slower of the two schemes
+    and accounts that haven't logged in since the switch still use it."""
+    return bcrypt.hashpw(
+        secrets.token_urlsafe(16).encode("utf-8"),
+        bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS),
+    ).decode("utf-8")
+
+
+def _verify_password(password: str, password_hash: str) -> tuple[bool, bool]:
+    """Returns (matches, needs_rehash)."""
+    if password_hash.startswith("$2"):
+        matches = bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+        return matches, matches
+    try:
+        _PH.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False, False
+    return True, _PH.check_needs_rehash(password_hash)
+
+
+_SELECT_USER_BY_EMAIL = text("SELECT id FROM users WHERE email = :email")
+
+_INSERT_USER = text("""
+    INSERT INTO users (email, name, password_hash, is_developer, is_active)
+    VALUES (:email, :name, :password_hash, :is_developer, :is_active)
+    RETURNING id, email, name, is_developer, is_active
+""")
 
 
 def create_user(
     email: str, password: str, name: str, is_developer: bool, is_active: bool, db: Session
 ) -> dict | None:
     existing = db.execute(
-        text("SELECT id FROM users WHERE email = :email"),
+        _SELECT_USER_BY_EMAIL,
         {"email": email},
     ).mappings().first()
 
@@ -39,11 +139,7 @@ def create_user(
     password_hash = _hash_password(password)
 
     row = db.execute(
-        text("""
-            INSERT INTO users (email, name, password_hash, is_developer, is_active)
-            VALUES (:email, :name, :password_hash, :is_developer, :is_active)
-            RETURNING id, email, name, is_developer, is_active
-        """),
+        _INSERT_USER,
         {
             "email": email,
             "name": name,
@@ -64,41 +160,58 @@ def create_user(
     }
 
 
-def update_user(user_id: str, updates: dict, db: Session) -> dict | None:
-    existing = db.execute(
-        text("SELECT id FROM users WHERE id = :user_id"),
-        {"user_id": user_id},
-    ).mappings().first()
+_SELECT_USER_ID = text("SELECT id FROM users WHERE id = :user_id")
 
-    if not existing:
-        return None
+# Only run when the guarded UPDATE below matched nothing, to tell a missing
+# user apart from an email taken by someone else
+_PROBE_UPDATE_MISS = text("""
+    SELECT
+        EXISTS (SELECT 1 FROM users WHERE id = :user_id) AS found,
+        EXISTS (
+            SELECT 1 FROM users WHERE email = :email AND id != :user_id
+        ) AS email_taken
+""")
 
-    if "password" in updates:
-        updates["password_hash"] = _hash_password(updates.pop("password"))
-
-    if "email" in updates:
-        conflict = db.execute(
-            text("SELECT id FROM users WHERE email = :email AND id != :user_id"),
-            {"email": updates["email"], "user_id": user_id},
-        ).mappings().first()
-        if conflict:
-            return "email_conflict"
 
+def update_user(user_id: str, updates: dict, db: Session) -> dict | None:
     if not updates:
-        return "no_fields"
+        existing = db.execute(_SELECT_USER_ID, {"user_id": user_id}).first()
+        return "no_fields" if existing else None
 
+    if "password" in updates:
+        updates["password_hash"] = _hash_password(updates.pop("password"))
+
+    # Single round trip in the common case: the email-conflict check rides
+    # along as a NOT EXISTS guard on the UPDATE itself
     set_clauses = ", ".join(f"{k} = :{k}" for k in updates)
+    email_guard = (
+        "AND NOT EXISTS (SELECT 1 FROM users WHERE email = :email AND id != :user_id)"
+        if "email" in updates
+        else ""
+    )
     updates["user_id"] = user_id
 
     row = db.execute(
         text(f"""
             UPDATE users SET {set_clauses}
-            WHERE id = :user_id
+            WHERE id = :user_id {email_guard}
             RETURNING id, email, name, is_developer, is_active
         """),
         updates,
     ).mappings().first()
 
+    if not row:
+        if "email" not in updates:
+            return None
+        probe = db.execute(
+            _PROBE_UPDATE_MISS,
+            {"user_id": user_id, "email": updates["email"]},
+        ).mappings().first()
+        if not probe["found"]:
+            return None
+        return "email_conflict"
+
+    _invalidate_user_access(user_id)
     logger.info(f"Updated user: {user_id}")
 
     return {
@@ -110,57 +223,78 @@ def update_user(user_id: str, updates: dict, db: Session) -> dict | None:
     }
 
 
-def list_users(db: Session) -> list[dict]:
-    rows = db.execute(
-        text("SELECT id, email, name, is_developer, is_active FROM users ORDER BY name ASC")
-    ).mappings().all()
+_SELECT_USERS_JSON = text("""
+    SELECT COALESCE(
+        json_agg(
+            json_build_object(
+                'id', id::text,
+                'email', email,
+                'name', name,
+                'is_developer', is_developer,
+                'is_active', is_active
+            ) ORDER BY name ASC
+        ),
+        '[]'::json
+    )::text
+    FROM users
+""")
+
+
+def list_users(db: Session) -> str:
+    """All users as a JSON array, built by Postgres."""
+    return db.execute(_SELECT_USERS_JSON).scalar_one()
 
-    return [
-        {
-            "id": str(r["id"]),
-            "email": r["email"],
-            "name": r["name"],
-            "is_developer": r["is_developer"],
-            "is_active": r["is_active"],
-        }
-        for r in rows
-    ]
+
+_DELETE_USER = text("DELETE FROM users WHERE email = :email RETURNING id")
 
 
 def delete_user(email: str, db: Session) -> bool:
     row = db.execute(
-        text("DELETE FROM users WHERE email = :email RETURNING id"),
+        _DELETE_USER,
         {"email": email},
     ).mappings().first()
 
     if not row:
         return False
 
+    _invalidate_user_access(str(row["id"]))
     logger.info(f"Deleted user: {email}")
     return True
 
 
+_SELECT_LOGIN_USER = text("""
+    SELECT id, email, name, password_hash, is_developer, is_active
+    FROM users
+    WHERE email = :email AND is_active = true
+""")
+
+_UPDATE_PASSWORD_HASH = text("UPDATE users SET password_hash = :password_hash WHERE id = :user_id")
+
+
 def login(email: str, password: str, db: Session) -> dict:
     row = db.execute(
-        text("""
-            SELECT id, email, name, password_hash, is_developer, is_active
-            FROM users
-            WHERE email = :email AND is_active = true
-        """),
+        _SELECT_LOGIN_USER,
         {"email": email},
     ).mappings().first()
 
-    if not row:
+    if not row or not row["password_hash"]:
+        # Still pay for a full verify so unknown emails can't be told apart by timing
+        _verify_password(password, _dummy_hash())
         logger.warning(f"Login failed — email not found: {email}")
         return None
 
-    if not row["password_hash"] or not bcrypt.checkpw(
-        password.encode("utf-8"), row["password_hash"].encode("utf-8")
-    ):
+    matches, needs_rehash = _verify_password(password, row["password_hash"])
+    if not matches:
         logger.warning(f"Login failed — wrong password: {email}")
         return None
 
     user_id = str(row["id"])
+    if needs_rehash:
+        db.execute(
+            _UPDATE_PASSWORD_HASH,
+            {"password_hash": _hash_password(password), "user_id": row["id"]},
+        )
+        logger.info(f"Upgraded password hash: {user_id}")
     companies = get_user_companies(user_id, db)
     access_token = _create_access_token(user_id, row["email"])
 
@@ -177,134 +311,173 @@ def login(email: str, password: str, db: Session) -> dict:
     }
 
 
+_SELECT_USER_COMPANIES = text("""
+    SELECT c.code, c.name, ucr.role
+    FROM user_company_roles ucr
+    JOIN companies c ON ucr.company_code = c.code
+    WHERE ucr.user_id = :user_id AND c.is_active = true
+    ORDER BY
+        CASE ucr.role
+            WHEN 'developer' THEN 6
+            WHEN 'admin'     THEN 5
+            WHEN 'ops'       THEN 4
+            WHEN 'approver'  THEN 3
+            WHEN 'viewer'    THEN 2
+            ELSE 1
+        END DESC,
+        ucr.company_code ASC
+""")
+
+
 def get_user_companies(user_id: str, db: Session) -> list[dict]:
+    if settings.IMS_ACCESS_CACHE_TTL > 0:
+        with _access_cache_lock:
+            cached = _companies_cache.get(user_id)
+        if cached is not None:
+            return cached
+
     rows = db.execute(
-        text("""
-            SELECT c.code, c.name, ucr.role
-            FROM user_company_roles ucr
-            JOIN companies c ON ucr.company_code = c.code
-            WHERE ucr.user_id = :user_id AND c.is_active = true
-            ORDER BY
-                CASE ucr.role
-                    WHEN 'developer' THEN 6
-                    WHEN 'admin'     THEN 5
-                    WHEN 'ops'       THEN 4
-                    WHEN 'approver'  THEN 3
-                    WHEN 'viewer'    THEN 2
-                    ELSE 1
-                END DESC,
-                c.code ASC
-        """),
+        _SELECT_USER_COMPANIES,
         {"user_id": user_id},
     ).mappings().all()
 
-    return [{"code": r["code"], "name": r["name"], "role": r["role"]} for r in rows]
+    companies = [{"code": r["code"], "name": r["name"], "role": r["role"]} for r in rows]
+    if settings.IMS_ACCESS_CACHE_TTL > 0:
+        with _access_cache_lock:
+            _companies_cache[user_id] = companies
+    return companies
+
+
+_SELECT_DASHBOARD_INFO = text("""
+    WITH access AS (
+        SELECT c.code, c.name, ucr.role
+        FROM user_company_roles ucr
+        JOIN companies c ON ucr.company_code = c.code
+        WHERE ucr.user_id = :user_id
+          AND c.code = :company_code
+          AND c.is_active = true
+        LIMIT 1
+    ),
+    mods AS (
+        SELECT
+            m.code   AS module_code,
+            m.name   AS module_name,
+            m.order_index,
+            COALESCE(mp.can_access,  false) AS can_access,
+            COALESCE(mp.can_view,    false) AS can_view,
+            COALESCE(mp.can_create,  false) AS can_create,
+            COALESCE(mp.can_edit,    false) AS can_edit,
+            COALESCE(mp.can_delete,  false) AS can_delete,
+            COALESCE(mp.can_approve, false) AS can_approve
+        FROM modules m
+        LEFT JOIN module_permissions mp
+            ON m.code = mp.module_code
+           AND mp.user_id = :user_id
+           AND mp.company_code = :company_code
+        WHERE m.company_code = :company_code AND m.is_active = true
+    )
+    SELECT
+        a.code, a.name, a.role,
+        (SELECT COUNT(*) FROM mods) AS total_modules,
+        (SELECT COUNT(*) FROM mods WHERE can_access) AS accessible_modules,
+        COALESCE(
+            (
+                SELECT json_agg(
+                    json_build_object(
+                        'module_code', module_code,
+                        'module_name', module_name,
+                        'permissions', json_build_object(
+                            'access',  can_access,
+                            'view',    can_view,
+                            'create',  can_create,
+                            'edit',    can_edit,
+                            'delete',  can_delete,
+                            'approve', can_approve
+                        )
+                    )
+                    ORDER BY order_index, module_code
+                )
+                FROM mods
+            ),
+            '[]'::json
+        ) AS modules
+    FROM access a
+""")
 
 
 def get_dashboard_info(user_id: str, company_code: str, db: Session) -> dict | None:
-    # Verify company access
-    company = db.execute(
-        text("""
-            SELECT c.code, c.name, ucr.role
-            FROM user_company_roles ucr
-            JOIN companies c ON ucr.company_code = c.code
-            WHERE ucr.user_id = :user_id
-              AND c.code = :company_code
-              AND c.is_active = true
-        """),
+    # Company access, module permissions and stats in one round trip;
+    # no row means no access to the company
+    row = db.execute(
+        _SELECT_DASHBOARD_INFO,
         {"user_id": user_id, "company_code": company_code},
     ).mappings().first()
 
-    if not company:
+    if not row:
         return None
 
-    # Fetch module permissions
-    modules = db.execute(
-        text("""
-            SELECT
-                m.code   AS module_code,
-                m.name   AS module_name,
-                COALESCE(mp.can_access,  false) AS can_access,
-                COALESCE(mp.can_view,    false) AS can_view,
-                COALESCE(mp.can_create,  false) AS can_create,
-                COALESCE(mp.can_edit,    false) AS can_edit,
-                COALESCE(mp.can_delete,  false) AS can_delete,
-                COALESCE(mp.can_approve, false) AS can_approve
-            FROM modules m
-            LEFT JOIN module_permissions mp
-                ON m.code = mp.module_code
-               AND mp.user_id = :user_id
-               AND mp.company_code = :company_code
-            WHERE m.company_code = :company_code AND m.is_active = true
-            ORDER BY m.order_index, m.code
-        """),
-        {"user_id": user_id, "company_code": company_code},
-    ).mappings().all()
-
-    # Dashboard stats
-    stats = db.execute(
-        text("""
-            SELECT
-                COUNT(*) AS total_modules,
-                SUM(CASE WHEN mp.can_access = true THEN 1 ELSE 0 END) AS accessible_modules
-            FROM modules m
-            LEFT JOIN module_permissions mp
-                ON m.code = mp.module_code
-               AND mp.user_id = :user_id
-               AND mp.company_code = :company_code
-            WHERE m.company_code = :company_code AND m.is_active = true
-        """),
-        {"user_id": user_id, "company_code": company_code},
-    ).mappings().first()
-
-    module_list = [
-        {
-            "module_code": m["module_code"],
-            "module_name": m["module_name"],
-            "permissions": {
-                "access": m["can_access"],
-                "view": m["can_view"],
-                "create": m["can_create"],
-                "edit": m["can_edit"],
-                "delete": m["can_delete"],
-                "approve": m["can_approve"],
-            },
-        }
-        for m in modules
-    ]
-
     return {
         "company": {
-            "code": company["code"],
-            "name": company["name"],
-            "role": company["role"],
+            "code": row["code"],
+            "name": row["name"],
+            "role": row["role"],
         },
         "dashboard": {
             "stats": {
-                "total_modules": stats["total_modules"],
-                "accessible_modules": int(stats["accessible_modules"] or 0),
+                "total_modules": row["total_modules"],
+                "accessible_modules": row["accessible_modules"],
             },
             "permissions": {
-                "modules": module_list,
+                "modules": row["modules"],
             },
         },
     }
 
 
+# User row and company list in one round trip; companies come back as
+# JSON in the same order as get_user_companies
+_SELECT_CURRENT_USER = text("""
+    SELECT
+        u.id, u.email, u.name, u.is_developer,
+        COALESCE(
+            (
+                SELECT json_agg(
+                    json_build_object('code', c.code, 'name', c.name, 'role', ucr.role)
+                    ORDER BY
+                        CASE ucr.role
+                            WHEN 'developer' THEN 6
+                            WHEN 'admin'     THEN 5
+                            WHEN 'ops'       THEN 4
+                            WHEN 'approver'  THEN 3
+                            WHEN 'viewer'    THEN 2
+                            ELSE 1
+                        END DESC,
+                        ucr.company_code ASC
+                )
+                FROM user_company_roles ucr
+                JOIN companies c ON ucr.company_code = c.code
+                WHERE ucr.user_id = u.id AND c.is_active = true
+            ),
+            '[]'::json
+        ) AS companies
+    FROM users u
+    WHERE u.id = :user_id AND u.is_active = true
+""")
+
+
 def get_current_user(user_id: str, db: Session) -> dict | None:
     row = db.execute(
-        text("""
-            SELECT id, email, name, is_developer
-            FROM users
-            WHERE id = :user_id AND is_active = true
-        """),
+        _SELECT_CURRENT_USER,
         {"user_id": user_id},
     ).mappings().first()
 
     if not row:
         return None
 
-    companies = get_user_companies(user_id, db)
+    companies = row["companies"]
+    if settings.IMS_ACCESS_CACHE_TTL > 0:
+        with _access_cache_lock:
+            _companies_cache[user_id] = companies
 
     return {
         "id": str(row["id"]),
@@ -318,35 +491,54 @@ def get_current_user(user_id: str, db: Session) -> dict | None:
 def check_permission(
     user_id: str, company_code: str, module_code: str, action: str, db: Session
 ) -> dict:
-    row = db.execute(
-        text("""
-            SELECT
-                CASE :action
-                    WHEN 'access'  THEN mp.can_access
-                    WHEN 'view'    THEN mp.can_view
-                    WHEN 'create'  THEN mp.can_create
-                    WHEN 'edit'    THEN mp.can_edit
-                    WHEN 'delete'  THEN mp.can_delete
-                    WHEN 'approve' THEN mp.can_approve
-                    ELSE false
-                END AS has_permission
-            FROM module_permissions mp
-            WHERE mp.user_id = :user_id
-              AND mp.company_code = :company_code
-              AND mp.module_code = :module_code
-        """),
-        {
-            "user_id": user_id,
-            "company_code": company_code,
-            "module_code": module_code,
-            "action": action,
-        },
-    ).mappings().first()
+    cache_key = (user_id, company_code, module_code, action)
+    with _access_cache_lock:
+        has_permission = _permission_cache.get(cache_key)
+    if has_permission is None:
+        has_permission = _query_permission(user_id, company_code, module_code, action, db)
+        if settings.IMS_ACCESS_CACHE_TTL > 0:
+            with _access_cache_lock:
+                _permission_cache[cache_key] = has_permission
 
     return {
-        "has_permission": bool(row["has_permission"]) if row else False,
+        "has_permission": has_permission,
         "user_id": user_id,
         "company": company_code,
         "module": module_code,
         "action": action,
     }
+
+
+# One static statement per action, selecting just that flag
+_PERMISSION_STMTS = {
+    action: text(f"""
+        SELECT mp.{column} AS has_permission
+        FROM module_permissions mp
+        WHERE mp.user_id = :user_id
+          AND mp.company_code = :company_code
+          AND mp.module_code = :module_code
+    """)
+    for action, column in {
+        "access": "can_access",
+        "view": "can_view",
+        "create": "can_create",
+        "edit": "can_edit",
+        "delete": "can_delete",
+        "approve": "can_approve",
+    }.items()
+}
+
+
+def _query_permission(
+    user_id: str, company_code: str, module_code: str, action: str, db: Session
+) -> bool:
+    stmt = _PERMISSION_STMTS.get(action)
+    if stmt is None:
+        return False
+
+    row = db.execute(
+        stmt,
+        {"user_id": user_id, "company_code": company_code, "module_code": module_code},
+    ).mappings().first()
+
+    return bool(row["has_permission"]) if row else False
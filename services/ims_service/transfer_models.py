@@ -281,10 +281,14 @@ class TransferRequestListResponse(BaseModel):
     success: bool = Field(..., description="Success status")
     message: str = Field(..., description="Response message")
     data: List[TransferRequestListItem] = Field(..., description="Transfer requests list")
-    total: int = Field(..., description="Total count")
+    total: Optional[int] = Field(..., description="Total count (None when include_total=false)")
     page: int = Field(..., description="Current page")
     per_page: int = Field(..., description="Items per page")
-    pages: int = Field(..., description="Total pages")
+    pages: Optional[int] = Field(..., description="Total pages (None when include_total=false)")
+    has_more: bool = Field(False, description="Whether another page follows")
+    next_cursor: Optional[Dict[str, Any]] = Field(
+        None, description="Pass back as after_created_at/after_id for the next page"
+    )
 
 
 # ============================================
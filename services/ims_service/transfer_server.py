@@ -1,7 +1,8 @@
-from datetime import date
+from datetime import date, datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from shared.database import get_db
@@ -21,6 +22,8 @@ from services.ims_service.transfer_tools import (
     create_transfer_request,
     get_transfer_requests,
     get_transfer_request_detail,
+    transfer_request_exists,
+    stream_scanned_boxes,
     submit_transfer,
     resolve_scanner_input,
     get_dc_data,
@@ -42,7 +45,8 @@ def get_warehouses_endpoint(
     db: Session = Depends(get_db),
 ):
     """Get all warehouses for dropdowns"""
-    return get_warehouses(is_active, db)
+    # Already-serialised JSON from Postgres; response_model documents the shape
+    return Response(content=get_warehouses(is_active, db), media_type="application/json")
 
 
 # ============================================
@@ -69,6 +73,9 @@ def get_transfer_requests_endpoint(
     created_by: Optional[str] = Query(None, description="Filter by creator"),
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+    after_created_at: Optional[datetime] = Query(None, description="Cursor: created_at of the last row seen"),
+    after_id: Optional[int] = Query(None, description="Cursor: id of the last row seen"),
+    include_total: bool = Query(True, description="Run the COUNT for total/pages"),
     db: Session = Depends(get_db),
 ):
     """Get transfer requests list with filtering and pagination"""
@@ -76,6 +83,8 @@ def get_transfer_requests_endpoint(
         request_status, from_warehouse, to_warehouse,
         request_date_from, request_date_to, created_by,
         page, per_page, db,
+        after_created_at=after_created_at, after_id=after_id,
+        include_total=include_total,
     )
 
 
@@ -88,6 +97,17 @@ def get_transfer_request_detail_endpoint(
     return get_transfer_request_detail(request_id, db)
 
 
+@router.get("/requests/{request_id}/scanned-boxes")
+def stream_scanned_boxes_endpoint(
+    request_id: int,
+    db: Session = Depends(get_db),
+):
+    """Stream a transfer's scanned boxes as NDJSON (one box per line)"""
+    if not transfer_request_exists(request_id, db):
+        raise HTTPException(status_code=404, detail="Transfer request not found")
+    return StreamingResponse(stream_scanned_boxes(request_id), media_type="application/x-ndjson")
+
+
 # ============================================
 # TRANSFER FORM ENDPOINTS
 # ============================================
@@ -139,13 +159,13 @@ def get_dc_data_endpoint(
 @router.get("/status-options")
 def get_status_options_endpoint():
     """Get available status options for transfer requests"""
-    return get_status_options()
+    return Response(content=get_status_options(), media_type="application/json")
 
 
 @router.get("/material-types")
 def get_material_types_endpoint():
     """Get available material types"""
-    return get_material_types()
+    return Response(content=get_material_types(), media_type="application/json")
 
 
 # ============================================
@@ -1,12 +1,14 @@
-import json
 from datetime import date, datetime
 from decimal import Decimal
-from typing import List, Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Tuple, Iterator
+
+import orjson
 
 from fastapi import HTTPException
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from shared.database import engine, SessionLocal
 from shared.logger import get_logger
 from services.ims_service.transfer_models import (
     TransferRequestCreate,
@@ -18,51 +20,142 @@ from services.ims_service.transfer_models import (
 logger = get_logger("ims.transfer")
 
 
+# ============================================
+# SCHEMA
+# ============================================
+
+
+# Request and transfer numbering depend on this table, so ensure_schema
+# lets a failure here stop startup
+_REQUIRED_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS transfer_daily_counters (
+        day     DATE    NOT NULL,
+        kind    TEXT    NOT NULL,
+        counter INTEGER NOT NULL,
+        PRIMARY KEY (day, kind)
+    )
+    """,
+]
+
+_SCHEMA_DDL = [
+    # Status / date-range list filters; INCLUDE lets the warehouse and
+    # creator filters be checked without heap fetches
+    """
+    CREATE INDEX IF NOT EXISTS idx_tr_status_date
+    ON transfer_requests (status, request_date DESC)
+    INCLUDE (from_warehouse, to_warehouse, created_by)
+    """,
+    # Newest-first list order and its keyset cursor
+    """
+    CREATE INDEX IF NOT EXISTS idx_tr_created_id
+    ON transfer_requests (created_at DESC, id DESC)
+    """,
+    # Same order behind the most common equality filters, so a filtered
+    # page is an index range read with no sort
+    """
+    CREATE INDEX IF NOT EXISTS idx_tr_status_created
+    ON transfer_requests (status, created_at DESC, id DESC)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_tr_from_created
+    ON transfer_requests (from_warehouse, created_at DESC, id DESC)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_tr_to_created
+    ON transfer_requests (to_warehouse, created_at DESC, id DESC)
+    """,
+    # Per-request item / scanned-box lookups (list item_count, detail, DC)
+    """
+    CREATE INDEX IF NOT EXISTS idx_tri_transfer
+    ON transfer_request_items (transfer_id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_tsb_transfer
+    ON transfer_scanned_boxes (transfer_id)
+    """,
+]
+
+
+def ensure_schema() -> None:
+    """Create the per-day number counters and list indexes for transfer requests."""
+    with engine.begin() as conn:
+        for ddl in _REQUIRED_DDL:
+            conn.execute(text(ddl))
+
+    for ddl in _SCHEMA_DDL:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+        except Exception as exc:
+            logger.error(f"Transfer DDL failed ({ddl.strip()}): {exc}")
+
+
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
 
 
+_BUMP_DAILY_COUNTER = text("""
+    UPDATE transfer_daily_counters
+    SET counter = counter + 1
+    WHERE day = CURRENT_DATE AND kind = :kind
+    RETURNING day, counter
+""")
+
+# First number of the day: continue after anything already issued today
+# (e.g. before the counter existed); the conflict arm covers a concurrent
+# first insert.
+_SEED_DAILY_COUNTER = """
+    INSERT INTO transfer_daily_counters (day, kind, counter)
+    SELECT CURRENT_DATE, :kind,
+           COALESCE(MAX(CAST(SUBSTRING({column} FROM {start}) AS INTEGER)), 0) + 1
+    FROM transfer_requests
+    WHERE {column} LIKE :kind || TO_CHAR(CURRENT_DATE, 'YYYYMMDD') || '%'
+      AND SUBSTRING({column} FROM {start}) ~ '^[0-9]+$'
+    ON CONFLICT (day, kind) DO UPDATE SET counter = transfer_daily_counters.counter + 1
+    RETURNING day, counter
+"""
+_SEED_REQUEST_COUNTER = text(_SEED_DAILY_COUNTER.format(column="request_no", start=12))
+_SEED_TRANSFER_COUNTER = text(_SEED_DAILY_COUNTER.format(column="transfer_no", start=14))
+
+
+def _next_daily_number(db: Session, kind: str, seed) -> str:
+    """<kind>YYYYMMDD + 3-digit per-day counter. The counter row stays
+    locked until commit, so concurrent callers get distinct numbers."""
+    row = db.execute(_BUMP_DAILY_COUNTER, {"kind": kind}).fetchone()
+    if row is None:
+        row = db.execute(seed, {"kind": kind}).one()
+    return f"{kind}{row.day:%Y%m%d}{row.counter:03d}"
+
+
 def _generate_request_no(db: Session) -> str:
     """Generate request number in format REQYYYYMMDDXXX"""
-    result = db.execute(text("""
-        SELECT 'REQ' || TO_CHAR(CURRENT_DATE, 'YYYYMMDD') ||
-               LPAD(COALESCE(MAX(CAST(SUBSTRING(request_no FROM 12) AS INTEGER)), 0) + 1, 3, '0')
-        FROM transfer_requests
-        WHERE request_no LIKE 'REQ' || TO_CHAR(CURRENT_DATE, 'YYYYMMDD') || '%'
-    """))
-    return result.scalar()
+    return _next_daily_number(db, "REQ", _SEED_REQUEST_COUNTER)
 
 
 def _generate_transfer_no(db: Session) -> str:
     """Generate transfer number in format TRANSYYYYMMDDXXX"""
-    result = db.execute(text("""
-        SELECT 'TRANS' || TO_CHAR(CURRENT_DATE, 'YYYYMMDD') ||
-               LPAD(COALESCE(MAX(CAST(SUBSTRING(transfer_no FROM 10) AS INTEGER)), 0) + 1, 3, '0')
-        FROM transfer_requests
-        WHERE transfer_no LIKE 'TRANS' || TO_CHAR(CURRENT_DATE, 'YYYYMMDD') || '%'
-    """))
-    return result.scalar()
-
-
-def _get_transfer_with_details(db: Session, transfer_id: int) -> Optional[Dict[str, Any]]:
-    """Get transfer request with all related details"""
-    query = text("""
-        SELECT
-            tr.id,
-            tr.request_no,
-            tr.transfer_no,
-            tr.request_date,
-            tr.from_warehouse,
-            tr.to_warehouse,
-            tr.reason,
-            tr.reason_description,
-            tr.status,
-            tr.created_by,
-            tr.created_at,
-            tr.updated_at,
-            COALESCE(
-                json_agg(
+    return _next_daily_number(db, "TRANS", _SEED_TRANSFER_COUNTER)
+
+
+_TRANSFER_DETAIL_QUERY = text("""
+    SELECT
+        tr.id,
+        tr.request_no,
+        tr.transfer_no,
+        tr.request_date,
+        tr.from_warehouse,
+        tr.to_warehouse,
+        tr.reason,
+        tr.reason_description,
+        tr.status,
+        tr.created_by,
+        tr.created_at,
+        tr.updated_at,
+        COALESCE(
+            (
+                SELECT json_agg(
                     json_build_object(
                         'id', tri.id,
                         'line_number', tri.line_number,
@@ -77,11 +170,15 @@ def _get_transfer_with_details(db: Session, transfer_id: int) -> Optional[Dict[s
                         'package_size', tri.package_size,
                         'net_weight', tri.net_weight
                     ) ORDER BY tri.line_number
-                ) FILTER (WHERE tri.id IS NOT NULL),
-                '[]'::json
-            ) as items,
-            COALESCE(
-                json_agg(
+                )
+                FROM transfer_request_items tri
+                WHERE tri.transfer_id = tr.id
+            ),
+            '[]'::json
+        ) as items,
+        COALESCE(
+            (
+                SELECT json_agg(
                     json_build_object(
                         'id', tsb.id,
                         'box_id', tsb.box_id,
@@ -95,34 +192,36 @@ def _get_transfer_with_details(db: Session, transfer_id: int) -> Optional[Dict[s
                         'scan_timestamp', tsb.scan_timestamp,
                         'qr_data', tsb.qr_data
                     ) ORDER BY tsb.box_number_in_array
-                ) FILTER (WHERE tsb.id IS NOT NULL),
-                '[]'::json
-            ) as scanned_boxes,
-            CASE
-                WHEN ti.id IS NOT NULL THEN
-                    json_build_object(
-                        'id', ti.id,
-                        'vehicle_number', ti.vehicle_number,
-                        'vehicle_number_other', ti.vehicle_number_other,
-                        'driver_name', ti.driver_name,
-                        'driver_name_other', ti.driver_name_other,
-                        'driver_phone', ti.driver_phone,
-                        'approval_authority', ti.approval_authority,
-                        'created_at', ti.created_at
-                    )
-                ELSE NULL
-            END as transport_info
-        FROM transfer_requests tr
-        LEFT JOIN transfer_request_items tri ON tr.id = tri.transfer_id
-        LEFT JOIN transfer_scanned_boxes tsb ON tr.id = tsb.transfer_id
-        LEFT JOIN transfer_info ti ON tr.id = ti.transfer_id
-        WHERE tr.id = :transfer_id
-        GROUP BY tr.id, ti.id, ti.vehicle_number, ti.vehicle_number_other,
-                 ti.driver_name, ti.driver_name_other, ti.driver_phone,
-                 ti.approval_authority, ti.created_at
-    """)
-
-    result = db.execute(query, {"transfer_id": transfer_id}).fetchone()
+                )
+                FROM transfer_scanned_boxes tsb
+                WHERE tsb.transfer_id = tr.id
+            ),
+            '[]'::json
+        ) as scanned_boxes,
+        (
+            SELECT json_build_object(
+                'id', ti.id,
+                'vehicle_number', ti.vehicle_number,
+                'vehicle_number_other', ti.vehicle_number_other,
+                'driver_name', ti.driver_name,
+                'driver_name_other', ti.driver_name_other,
+                'driver_phone', ti.driver_phone,
+                'approval_authority', ti.approval_authority,
+                'created_at', ti.created_at
+            )
+            FROM transfer_info ti
+            WHERE ti.transfer_id = tr.id
+            ORDER BY ti.id DESC
+            LIMIT 1
+        ) as transport_info
+    FROM transfer_requests tr
+    WHERE tr.id = :transfer_id
+""")
+
+
+def _get_transfer_with_details(db: Session, transfer_id: int) -> Optional[Dict[str, Any]]:
+    """Get transfer request with all related details"""
+    result = db.execute(_TRANSFER_DETAIL_QUERY, {"transfer_id": transfer_id}).fetchone()
 
     if result:
         return {
@@ -146,75 +245,44 @@ def _get_transfer_with_details(db: Session, transfer_id: int) -> Optional[Dict[s
     return None
 
 
-def _get_warehouse_addresses(db: Session, warehouse_codes: List[str]) -> Dict[str, Dict[str, Any]]:
-    """Get warehouse addresses for DC generation"""
-    placeholders = ", ".join(f":code_{i}" for i in range(len(warehouse_codes)))
-    params = {f"code_{i}": code for i, code in enumerate(warehouse_codes)}
-    rows = db.execute(
-        text(f"""
-            SELECT warehouse_code, warehouse_name, address, city, state,
-                   pincode, gstin, contact_person, contact_phone, contact_email
-            FROM warehouse_master
-            WHERE warehouse_code IN ({placeholders})
-        """),
-        params,
-    ).fetchall()
-
-    return {
-        row.warehouse_code: {
-            "code": row.warehouse_code,
-            "name": row.warehouse_name,
-            "address": row.address,
-            "city": row.city,
-            "state": row.state,
-            "pincode": row.pincode,
-            "gstin": row.gstin,
-            "contact_person": row.contact_person,
-            "contact_phone": row.contact_phone,
-            "contact_email": row.contact_email,
-        }
-        for row in rows
-    }
-
-
 # ============================================
 # WAREHOUSE ENDPOINTS
 # ============================================
 
 
-def get_warehouses(is_active: bool, db: Session) -> list:
-    """Get all warehouses for dropdowns"""
-    rows = db.execute(
-        text("""
-            SELECT id, warehouse_code, warehouse_name, address, city, state,
-                   pincode, gstin, contact_person, contact_phone, contact_email,
-                   is_active, created_at, updated_at
-            FROM warehouse_master
-            WHERE is_active = :is_active
-            ORDER BY warehouse_name
-        """),
+_WAREHOUSES_JSON_QUERY = text("""
+    SELECT COALESCE(
+        json_agg(
+            json_build_object(
+                'id', id,
+                'warehouse_code', warehouse_code,
+                'warehouse_name', warehouse_name,
+                'address', address,
+                'city', city,
+                'state', state,
+                'pincode', pincode,
+                'gstin', gstin,
+                'contact_person', contact_person,
+                'contact_phone', contact_phone,
+                'contact_email', contact_email,
+                'is_active', is_active,
+                'created_at', created_at,
+                'updated_at', updated_at
+            ) ORDER BY warehouse_name
+        ),
+        '[]'::json
+    )::text
+    FROM warehouse_master
+    WHERE is_active = :is_active
+""")
+
+
+def get_warehouses(is_active: bool, db: Session) -> str:
+    """Get all warehouses for dropdowns, as a JSON array built by Postgres"""
+    return db.execute(
+        _WAREHOUSES_JSON_QUERY,
         {"is_active": is_active},
-    ).fetchall()
-
-    return [
-        {
-            "id": row.id,
-            "warehouse_code": row.warehouse_code,
-            "warehouse_name": row.warehouse_name,
-            "address": row.address,
-            "city": row.city,
-            "state": row.state,
-            "pincode": row.pincode,
-            "gstin": row.gstin,
-            "contact_person": row.contact_person,
-            "contact_phone": row.contact_phone,
-            "contact_email": row.contact_email,
-            "is_active": row.is_active,
-            "created_at": row.created_at,
-            "updated_at": row.updated_at,
-        }
-        for row in rows
-    ]
+    ).scalar_one()
 
 
 # ============================================
@@ -222,22 +290,53 @@ def get_warehouses(is_active: bool, db: Session) -> list:
 # ============================================
 
 
+_INSERT_TRANSFER_REQUEST = text("""
+    WITH new_req AS (
+        INSERT INTO transfer_requests
+            (request_no, request_date, from_warehouse, to_warehouse,
+             reason, reason_description, status, created_by)
+        VALUES
+            (:request_no, :request_date, :from_warehouse, :to_warehouse,
+             :reason, :reason_description, 'Pending', :created_by)
+        RETURNING id
+    ),
+    new_items AS (
+        INSERT INTO transfer_request_items
+            (transfer_id, line_number, material_type, item_category,
+             sub_category, item_description, sku_id, quantity,
+             uom, pack_size, package_size, net_weight)
+        SELECT new_req.id, v.*
+        FROM new_req
+        CROSS JOIN unnest(
+            CAST(:line_numbers AS int[]),
+            CAST(:material_types AS text[]),
+            CAST(:item_categories AS text[]),
+            CAST(:sub_categories AS text[]),
+            CAST(:item_descriptions AS text[]),
+            CAST(:sku_ids AS text[]),
+            CAST(:quantities AS numeric[]),
+            CAST(:uoms AS text[]),
+            CAST(:pack_sizes AS numeric[]),
+            CAST(:package_sizes AS text[]),
+            CAST(:net_weights AS numeric[])
+        ) AS v(line_number, material_type, item_category,
+               sub_category, item_description, sku_id, quantity,
+               uom, pack_size, package_size, net_weight)
+    )
+    SELECT id FROM new_req
+""")
+
+
 def create_transfer_request(request_data: TransferRequestCreate, db: Session) -> dict:
     """Create a new transfer request with items"""
     # Use request_no from frontend if provided, otherwise generate one
     request_no = request_data.request_no if request_data.request_no else _generate_request_no(db)
 
-    # Insert transfer request header
-    header = db.execute(
-        text("""
-            INSERT INTO transfer_requests
-                (request_no, request_date, from_warehouse, to_warehouse,
-                 reason, reason_description, status, created_by)
-            VALUES
-                (:request_no, :request_date, :from_warehouse, :to_warehouse,
-                 :reason, :reason_description, 'Pending', :created_by)
-            RETURNING id, request_no
-        """),
+    # Header and items in one statement; item columns are bound as parallel
+    # arrays and unnested against the new header id
+    items = request_data.items
+    request_id = db.execute(
+        _INSERT_TRANSFER_REQUEST,
         {
             "request_no": request_no,
             "request_date": request_data.request_date,
@@ -246,39 +345,19 @@ def create_transfer_request(request_data: TransferRequestCreate, db: Session) ->
             "reason": request_data.reason,
             "reason_description": request_data.reason_description,
             "created_by": request_data.created_by,
+            "line_numbers": [i.line_number for i in items],
+            "material_types": [i.material_type for i in items],
+            "item_categories": [i.item_category for i in items],
+            "sub_categories": [i.sub_category for i in items],
+            "item_descriptions": [i.item_description for i in items],
+            "sku_ids": [i.sku_id for i in items],
+            "quantities": [i.quantity for i in items],
+            "uoms": [i.uom for i in items],
+            "pack_sizes": [i.pack_size for i in items],
+            "package_sizes": [i.package_size for i in items],
+            "net_weights": [i.net_weight for i in items],
         },
-    ).fetchone()
-
-    request_id = header.id
-
-    # Insert transfer request items
-    for item_data in request_data.items:
-        db.execute(
-            text("""
-                INSERT INTO transfer_request_items
-                    (transfer_id, line_number, material_type, item_category,
-                     sub_category, item_description, sku_id, quantity,
-                     uom, pack_size, package_size, net_weight)
-                VALUES
-                    (:transfer_id, :line_number, :material_type, :item_category,
-                     :sub_category, :item_description, :sku_id, :quantity,
-                     :uom, :pack_size, :package_size, :net_weight)
-            """),
-            {
-                "transfer_id": request_id,
-                "line_number": item_data.line_number,
-                "material_type": item_data.material_type,
-                "item_category": item_data.item_category,
-                "sub_category": item_data.sub_category,
-                "item_description": item_data.item_description,
-                "sku_id": item_data.sku_id,
-                "quantity": float(item_data.quantity),
-                "uom": item_data.uom,
-                "pack_size": float(item_data.pack_size),
-                "package_size": item_data.package_size,
-                "net_weight": float(item_data.net_weight),
-            },
-        )
+    ).scalar_one()
 
     return {
         "success": True,
@@ -297,8 +376,17 @@ def get_transfer_requests(
     page: int,
     per_page: int,
     db: Session,
+    after_created_at: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    include_total: bool = True,
 ) -> dict:
-    """Get transfer requests list with filtering and pagination"""
+    """Get transfer requests list with filtering and pagination.
+
+    Passing the previous page's ``next_cursor`` (after_created_at/after_id)
+    seeks straight past it instead of using OFFSET; ``page`` is then ignored.
+    With ``include_total=False`` the COUNT is skipped and ``total``/``pages``
+    come back as None; ``has_more`` is always set.
+    """
     clauses = ["1=1"]
     params: dict = {}
 
@@ -324,14 +412,23 @@ def get_transfer_requests(
     where = " AND ".join(clauses)
 
     # Get total count
-    total = db.execute(
-        text(f"SELECT COUNT(*) FROM transfer_requests tr WHERE {where}"),
-        params,
-    ).scalar()
+    total = None
+    if include_total:
+        total = db.execute(
+            text(f"SELECT COUNT(*) FROM transfer_requests tr WHERE {where}"),
+            params,
+        ).scalar()
 
     # Get paginated results with item counts
-    offset = (page - 1) * per_page
-    params["limit"] = per_page
+    if after_created_at is not None and after_id is not None:
+        where += " AND (tr.created_at, tr.id) < (:after_created_at, :after_id)"
+        params["after_created_at"] = after_created_at
+        params["after_id"] = after_id
+        offset = 0
+    else:
+        offset = (page - 1) * per_page
+    # One extra row tells whether another page exists without counting
+    params["limit"] = per_page + 1
     params["offset"] = offset
 
     rows = db.execute(
@@ -340,16 +437,19 @@ def get_transfer_requests(
                 tr.id, tr.request_no, tr.transfer_no, tr.request_date,
                 tr.from_warehouse, tr.to_warehouse, tr.reason_description,
                 tr.status, tr.created_by, tr.created_at,
-                COUNT(tri.id) AS item_count
+                (
+                    SELECT COUNT(*) FROM transfer_request_items tri
+                    WHERE tri.transfer_id = tr.id
+                ) AS item_count
             FROM transfer_requests tr
-            LEFT JOIN transfer_request_items tri ON tr.id = tri.transfer_id
             WHERE {where}
-            GROUP BY tr.id
-            ORDER BY tr.created_at DESC
+            ORDER BY tr.created_at DESC, tr.id DESC
             LIMIT :limit OFFSET :offset
         """),
         params,
     ).fetchall()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
 
     request_list = [
         {
@@ -375,7 +475,13 @@ def get_transfer_requests(
         "total": total,
         "page": page,
         "per_page": per_page,
-        "pages": (total + per_page - 1) // per_page if total else 0,
+        "pages": None if total is None else (total + per_page - 1) // per_page,
+        "has_more": has_more,
+        "next_cursor": (
+            {"after_created_at": rows[-1].created_at, "after_id": rows[-1].id}
+            if has_more
+            else None
+        ),
     }
 
 
@@ -393,20 +499,88 @@ def get_transfer_request_detail(request_id: int, db: Session) -> dict:
     }
 
 
+_TRANSFER_REQUEST_EXISTS = text("SELECT 1 FROM transfer_requests WHERE id = :id")
+
+
+def transfer_request_exists(request_id: int, db: Session) -> bool:
+    return db.execute(
+        _TRANSFER_REQUEST_EXISTS, {"id": request_id}
+    ).first() is not None
+
+
+_SCANNED_BOXES_STREAM_BATCH = 500
+
+
+_SCANNED_BOXES_STREAM_QUERY = text("""
+    SELECT id, box_id, transaction_no, sku_id, box_number_in_array,
+           box_number, item_description, net_weight, gross_weight,
+           scan_timestamp, qr_data
+    FROM transfer_scanned_boxes
+    WHERE transfer_id = :transfer_id
+    ORDER BY box_number_in_array
+""")
+
+
+def stream_scanned_boxes(request_id: int) -> Iterator[bytes]:
+    """NDJSON of a transfer's scanned boxes, read through a server-side
+    cursor in batches so large transfers aren't buffered whole. Uses its
+    own session because it runs after the request's session is closed."""
+    with SessionLocal() as db:
+        rows = db.execute(
+            _SCANNED_BOXES_STREAM_QUERY,
+            {"transfer_id": request_id},
+            execution_options={"yield_per": _SCANNED_BOXES_STREAM_BATCH},
+        ).mappings()
+        for row in rows:
+            yield orjson.dumps(dict(row), default=float) + b"\n"
+
+
 # ============================================
 # TRANSFER SUBMISSION
 # ============================================
 
 
+# Looks the request up and flips its status in one statement; a request
+# without a transfer number yet gets one assigned right after
+_MARK_IN_TRANSIT = text("""
+    UPDATE transfer_requests
+    SET status = 'In Transit'
+    WHERE request_no = :request_no
+    RETURNING id, transfer_no
+""")
+
+_ASSIGN_TRANSFER_NO = text("""
+    UPDATE transfer_requests
+    SET transfer_no = :transfer_no
+    WHERE id = :id
+""")
+
+_INSERT_SCANNED_BOX = text("""
+    INSERT INTO transfer_scanned_boxes
+        (transfer_id, box_id, transaction_no, sku_id,
+         box_number_in_array, box_number, item_description,
+         net_weight, gross_weight, qr_data)
+    VALUES
+        (:transfer_id, :box_id, :transaction_no, :sku_id,
+         :box_number_in_array, :box_number, :item_description,
+         :net_weight, :gross_weight, CAST(:qr_data AS json))
+""")
+
+_INSERT_TRANSFER_INFO = text("""
+    INSERT INTO transfer_info
+        (transfer_id, vehicle_number, vehicle_number_other,
+         driver_name, driver_name_other, driver_phone, approval_authority)
+    VALUES
+        (:transfer_id, :vehicle_number, :vehicle_number_other,
+         :driver_name, :driver_name_other, :driver_phone, :approval_authority)
+""")
+
+
 def submit_transfer(transfer_data: TransferCompleteCreate, db: Session) -> dict:
     """Submit complete transfer with scanned boxes and transport details"""
-    # Find the existing request
+    # Find the existing request and mark it in transit
     existing_request = db.execute(
-        text("""
-            SELECT id, request_no, transfer_no, status
-            FROM transfer_requests
-            WHERE request_no = :request_no
-        """),
+        _MARK_IN_TRANSIT,
         {"request_no": transfer_data.request_no},
     ).fetchone()
 
@@ -416,64 +590,39 @@ def submit_transfer(transfer_data: TransferCompleteCreate, db: Session) -> dict:
     request_id = existing_request.id
 
     # Generate transfer number if not exists
-    if not existing_request.transfer_no:
+    transfer_no = existing_request.transfer_no
+    if not transfer_no:
         transfer_no = _generate_transfer_no(db)
         db.execute(
-            text("""
-                UPDATE transfer_requests
-                SET transfer_no = :transfer_no, status = 'In Transit'
-                WHERE id = :id
-            """),
+            _ASSIGN_TRANSFER_NO,
             {"transfer_no": transfer_no, "id": request_id},
         )
-    else:
-        transfer_no = existing_request.transfer_no
-        db.execute(
-            text("""
-                UPDATE transfer_requests
-                SET status = 'In Transit'
-                WHERE id = :id
-            """),
-            {"id": request_id},
-        )
 
-    # Insert scanned boxes
-    for box_data in transfer_data.scanned_boxes:
+    # Insert scanned boxes in one executemany batch
+    box_rows = [
+        {
+            "transfer_id": request_id,
+            "box_id": box_data.box_id,
+            "transaction_no": box_data.transaction_no,
+            "sku_id": box_data.sku_id,
+            "box_number_in_array": box_data.box_number_in_array,
+            "box_number": box_data.box_number,
+            "item_description": box_data.item_description,
+            "net_weight": box_data.net_weight,
+            "gross_weight": box_data.gross_weight,
+            "qr_data": orjson.dumps(box_data.qr_data).decode() if box_data.qr_data else None,
+        }
+        for box_data in transfer_data.scanned_boxes
+    ]
+    if box_rows:
         db.execute(
-            text("""
-                INSERT INTO transfer_scanned_boxes
-                    (transfer_id, box_id, transaction_no, sku_id,
-                     box_number_in_array, box_number, item_description,
-                     net_weight, gross_weight, qr_data)
-                VALUES
-                    (:transfer_id, :box_id, :transaction_no, :sku_id,
-                     :box_number_in_array, :box_number, :item_description,
-                     :net_weight, :gross_weight, :qr_data::json)
-            """),
-            {
-                "transfer_id": request_id,
-                "box_id": box_data.box_id,
-                "transaction_no": box_data.transaction_no,
-                "sku_id": box_data.sku_id,
-                "box_number_in_array": box_data.box_number_in_array,
-                "box_number": box_data.box_number,
-                "item_description": box_data.item_description,
-                "net_weight": float(box_data.net_weight),
-                "gross_weight": float(box_data.gross_weight),
-                "qr_data": json.dumps(box_data.qr_data) if box_data.qr_data else None,
-            },
+            _INSERT_SCANNED_BOX,
+            box_rows,
         )
 
     # Insert transport info
     db.execute(
-        text("""
-            INSERT INTO transfer_info
-                (transfer_id, vehicle_number, vehicle_number_other,
-                 driver_name, driver_name_other, driver_phone, approval_authority)
-            VALUES
-                (:transfer_id, :vehicle_number, :vehicle_number_other,
-                 :driver_name, :driver_name_other, :driver_phone, :approval_authority)
-        """),
+        _INSERT_TRANSFER_INFO,
         {
             "transfer_id": request_id,
             "vehicle_number": transfer_data.transport_info.vehicle_number,
@@ -502,29 +651,35 @@ def submit_transfer(transfer_data: TransferCompleteCreate, db: Session) -> dict:
 # ============================================
 
 
+# Fixed part of a resolved scan, validated once; each scan only fills in
+# the values derived from the scanned string
+_BOX_SCAN_TEMPLATE = BoxScanData(
+    scan_value="",
+    sku_id="SKU001234",
+    sku_name="Wheat Flour 1kg",
+    material_type="RM",
+    uom="KG",
+    available_qty=Decimal("100.000"),
+    expiry_date=date(2024, 2, 15),
+    fefo_priority=1,
+).model_dump()
+
+
 def resolve_scanner_input(scanner_input: ScannerInput, db: Session) -> dict:
     """Resolve scanned box/lot/batch information"""
     scan_value = scanner_input.scan_value.strip()
 
     if scan_value.startswith("TX"):
-        box_data = BoxScanData(
-            scan_value=scan_value,
-            resolved_box=f"BOX{scan_value[-2:]}",
-            resolved_lot=f"LOT{scan_value[-4:-2]}",
-            resolved_batch=f"BATCH{scan_value[-6:-4]}",
-            sku_id="SKU001234",
-            sku_name="Wheat Flour 1kg",
-            material_type="RM",
-            uom="KG",
-            available_qty=Decimal("100.000"),
-            expiry_date=date(2024, 2, 15),
-            fefo_priority=1,
-        )
-
         return {
             "success": True,
             "message": "Scan resolved successfully",
-            "data": box_data.model_dump(),
+            "data": {
+                **_BOX_SCAN_TEMPLATE,
+                "scan_value": scan_value,
+                "resolved_box": f"BOX{scan_value[-2:]}",
+                "resolved_lot": f"LOT{scan_value[-4:-2]}",
+                "resolved_batch": f"BATCH{scan_value[-6:-4]}",
+            },
         }
     else:
         return {
@@ -539,107 +694,116 @@ def resolve_scanner_input(scanner_input: ScannerInput, db: Session) -> dict:
 # ============================================
 
 
+def _dc_warehouse_json(column: str) -> str:
+    """JSON address object for the warehouse referenced by ``tr.<column>``."""
+    return f"""
+            COALESCE(
+                (
+                    SELECT json_build_object(
+                        'code', wm.warehouse_code,
+                        'name', wm.warehouse_name,
+                        'address', wm.address,
+                        'city', wm.city,
+                        'state', wm.state,
+                        'pincode', wm.pincode,
+                        'gstin', wm.gstin,
+                        'contact_person', wm.contact_person,
+                        'contact_phone', wm.contact_phone,
+                        'contact_email', wm.contact_email
+                    )
+                    FROM warehouse_master wm
+                    WHERE wm.warehouse_code = tr.{column}
+                    LIMIT 1
+                ),
+                '{{}}'::json
+            )"""
+
+
+# Header, warehouse addresses, items, scanned boxes and transport info in
+# one round trip; the nested parts come back as JSON columns
+_DC_DATA_QUERY = text(f"""
+    SELECT
+        tr.request_no, tr.transfer_no, tr.request_date,
+        {_dc_warehouse_json("from_warehouse")} AS from_warehouse,
+        {_dc_warehouse_json("to_warehouse")} AS to_warehouse,
+        COALESCE(
+            (
+                SELECT json_agg(
+                    json_build_object(
+                        'line_number', tri.line_number,
+                        'material_type', tri.material_type,
+                        'item_category', tri.item_category,
+                        'sub_category', tri.sub_category,
+                        'item_description', tri.item_description,
+                        'sku_id', tri.sku_id,
+                        'quantity', tri.quantity,
+                        'uom', tri.uom,
+                        'pack_size', tri.pack_size,
+                        'package_size', tri.package_size,
+                        'net_weight', tri.net_weight
+                    ) ORDER BY tri.line_number
+                )
+                FROM transfer_request_items tri
+                WHERE tri.transfer_id = tr.id
+            ),
+            '[]'::json
+        ) AS items,
+        COALESCE(
+            (
+                SELECT json_agg(
+                    json_build_object(
+                        'box_id', tsb.box_id,
+                        'transaction_no', tsb.transaction_no,
+                        'sku_id', tsb.sku_id,
+                        'box_number', tsb.box_number,
+                        'item_description', tsb.item_description,
+                        'net_weight', tsb.net_weight,
+                        'gross_weight', tsb.gross_weight
+                    ) ORDER BY tsb.box_number_in_array
+                )
+                FROM transfer_scanned_boxes tsb
+                WHERE tsb.transfer_id = tr.id
+            ),
+            '[]'::json
+        ) AS scanned_boxes,
+        (
+            SELECT json_build_object(
+                'vehicle_number', ti.vehicle_number,
+                'vehicle_number_other', ti.vehicle_number_other,
+                'driver_name', ti.driver_name,
+                'driver_name_other', ti.driver_name_other,
+                'driver_phone', ti.driver_phone,
+                'approval_authority', ti.approval_authority
+            )
+            FROM transfer_info ti
+            WHERE ti.transfer_id = tr.id
+            ORDER BY ti.id DESC
+            LIMIT 1
+        ) AS transport_info
+    FROM transfer_requests tr
+    WHERE tr.transfer_no = :transfer_no
+""")
+
+
 def get_dc_data(company: str, transfer_no: str, db: Session) -> dict:
     """Get delivery challan data for DC generation"""
-    # Get transfer request with transfer number
-    transfer_request = db.execute(
-        text("""
-            SELECT id, request_no, transfer_no, request_date,
-                   from_warehouse, to_warehouse
-            FROM transfer_requests
-            WHERE transfer_no = :transfer_no
-        """),
-        {"transfer_no": transfer_no},
-    ).fetchone()
+    row = db.execute(_DC_DATA_QUERY, {"transfer_no": transfer_no}).fetchone()
 
-    if not transfer_request:
+    if not row:
         raise HTTPException(status_code=404, detail="Transfer not found")
 
-    # Get warehouse addresses
-    warehouse_codes = [transfer_request.from_warehouse, transfer_request.to_warehouse]
-    warehouse_addresses = _get_warehouse_addresses(db, warehouse_codes)
-
-    # Get items
-    items = db.execute(
-        text("""
-            SELECT line_number, material_type, item_category, sub_category,
-                   item_description, sku_id, quantity, uom, pack_size,
-                   package_size, net_weight
-            FROM transfer_request_items
-            WHERE transfer_id = :transfer_id
-            ORDER BY line_number
-        """),
-        {"transfer_id": transfer_request.id},
-    ).fetchall()
-
-    # Get scanned boxes
-    scanned_boxes = db.execute(
-        text("""
-            SELECT box_id, transaction_no, sku_id, box_number,
-                   item_description, net_weight, gross_weight
-            FROM transfer_scanned_boxes
-            WHERE transfer_id = :transfer_id
-            ORDER BY box_number_in_array
-        """),
-        {"transfer_id": transfer_request.id},
-    ).fetchall()
-
-    # Get transport info
-    transport_info = db.execute(
-        text("""
-            SELECT vehicle_number, vehicle_number_other, driver_name,
-                   driver_name_other, driver_phone, approval_authority
-            FROM transfer_info
-            WHERE transfer_id = :transfer_id
-        """),
-        {"transfer_id": transfer_request.id},
-    ).fetchone()
-
-    if not transport_info:
+    if not row.transport_info:
         raise HTTPException(status_code=400, detail="Transport information not found")
 
     return {
-        "transfer_no": transfer_request.transfer_no,
-        "request_no": transfer_request.request_no,
-        "request_date": transfer_request.request_date,
-        "from_warehouse": warehouse_addresses.get(transfer_request.from_warehouse, {}),
-        "to_warehouse": warehouse_addresses.get(transfer_request.to_warehouse, {}),
-        "items": [
-            {
-                "line_number": item.line_number,
-                "material_type": item.material_type,
-                "item_category": item.item_category,
-                "sub_category": item.sub_category,
-                "item_description": item.item_description,
-                "sku_id": item.sku_id,
-                "quantity": item.quantity,
-                "uom": item.uom,
-                "pack_size": item.pack_size,
-                "package_size": item.package_size,
-                "net_weight": item.net_weight,
-            }
-            for item in items
-        ],
-        "scanned_boxes": [
-            {
-                "box_id": box.box_id,
-                "transaction_no": box.transaction_no,
-                "sku_id": box.sku_id,
-                "box_number": box.box_number,
-                "item_description": box.item_description,
-                "net_weight": box.net_weight,
-                "gross_weight": box.gross_weight,
-            }
-            for box in scanned_boxes
-        ],
-        "transport_info": {
-            "vehicle_number": transport_info.vehicle_number,
-            "vehicle_number_other": transport_info.vehicle_number_other,
-            "driver_name": transport_info.driver_name,
-            "driver_name_other": transport_info.driver_name_other,
-            "driver_phone": transport_info.driver_phone,
-            "approval_authority": transport_info.approval_authority,
-        },
+        "transfer_no": row.transfer_no,
+        "request_no": row.request_no,
+        "request_date": row.request_date,
+        "from_warehouse": row.from_warehouse,
+        "to_warehouse": row.to_warehouse,
+        "items": row.items,
+        "scanned_boxes": row.scanned_boxes,
+        "transport_info": row.transport_info,
     }
 
 
@@ -648,30 +812,36 @@ def get_dc_data(company: str, transfer_no: str, db: Session) -> dict:
 # ============================================
 
 
-def get_status_options() -> dict:
-    """Get available status options for transfer requests"""
-    return {
-        "success": True,
-        "message": "Status options retrieved successfully",
-        "data": [
-            {"value": "Pending", "label": "Pending"},
-            {"value": "Approved", "label": "Approved"},
-            {"value": "Rejected", "label": "Rejected"},
-            {"value": "In Transit", "label": "In Transit"},
-            {"value": "Completed", "label": "Completed"},
-        ],
-    }
-
-
-def get_material_types() -> dict:
-    """Get available material types"""
-    return {
-        "success": True,
-        "message": "Material types retrieved successfully",
-        "data": [
-            {"value": "RM", "label": "Raw Material"},
-            {"value": "PM", "label": "Packaging Material"},
-            {"value": "FG", "label": "Finished Good"},
-            {"value": "SFG", "label": "Semi-Finished Good"},
-        ],
-    }
+# Static option lists, serialised once at import
+_STATUS_OPTIONS_JSON = orjson.dumps({
+    "success": True,
+    "message": "Status options retrieved successfully",
+    "data": [
+        {"value": "Pending", "label": "Pending"},
+        {"value": "Approved", "label": "Approved"},
+        {"value": "Rejected", "label": "Rejected"},
+        {"value": "In Transit", "label": "In Transit"},
+        {"value": "Completed", "label": "Completed"},
+    ],
+})
+
+_MATERIAL_TYPES_JSON = orjson.dumps({
+    "success": True,
+    "message": "Material types retrieved successfully",
+    "data": [
+        {"value": "RM", "label": "Raw Material"},
+        {"value": "PM", "label": "Packaging Material"},
+        {"value": "FG", "label": "Finished Good"},
+        {"value": "SFG", "label": "Semi-Finished Good"},
+    ],
+})
+
+
+def get_status_options() -> bytes:
+    """Get available status options for transfer requests, as JSON bytes"""
+    return _STATUS_OPTIONS_JSON
+
+
+def get_material_types() -> bytes:
+    """Get available material types, as JSON bytes"""
+    return _MATERIAL_TYPES_JSON
@@ -4,6 +4,8 @@ from functools import lru_cache
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # Optional read replica for read-only lookups; empty uses DATABASE_URL.
+    READ_REPLICA_URL: str = ""
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
@@ -17,7 +19,21 @@ class Settings(BaseSettings):
     IMS_JWT_SECRET: str = ""
     IMS_JWT_ALGORITHM: str = "HS256"
     IMS_JWT_EXPIRATION_HOURS: int = 24
+    # Seconds to cache IMS company roles / module permissions per user per
+    # process; 0 disables. Role changes made outside this service lag by this much.
+    IMS_ACCESS_CACHE_TTL: int = 30
     ANTHROPIC_API_KEY: str = ""
+    # bcrypt cost for new promoter password/OTP hashes; existing hashes keep their own.
+    BCRYPT_ROUNDS: int = 12
+    # Trade durability of the last few ms of commits for lower latency on
+    # bulk transfer-in box inserts (SET LOCAL synchronous_commit = off).
+    INTERUNIT_ASYNC_COMMIT: bool = False
+    # Seconds to cache inward list/detail reads per process; 0 disables.
+    INWARD_READ_CACHE_TTL: int = 5
+    # Seconds to reuse a PO extraction for byte-identical PDFs; 0 disables.
+    PO_EXTRACT_CACHE_TTL: int = 7 * 86400
+    # Seconds to cache SKU dropdown facet lists per process; 0 disables.
+    SKU_FACET_CACHE_TTL: int = 300
 
     class Config:
         env_file = ".env"
@@ -2,8 +2,18 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from shared.config_loader import settings
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+# pool_recycle keeps pooled connections younger than typical server/proxy
+# idle timeouts, so rarely-used paths (e.g. the nightly scheduler job)
+# don't start on a connection the server already dropped
+engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, pool_recycle=1800)
+SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+
+read_engine = (
+    create_engine(settings.READ_REPLICA_URL, pool_pre_ping=True, pool_recycle=1800)
+    if settings.READ_REPLICA_URL
+    else engine
+)
+ReadSessionLocal = sessionmaker(bind=read_engine, autocommit=False, autoflush=False)
 
 
 class Base(DeclarativeBase):
@@ -20,3 +30,13 @@ def get_db():
         raise
     finally:
         db.close()
+
+
+def get_read_db():
+    """Session on the read replica (or the primary if none is configured).
+    For read-only endpoints that tolerate replication lag; never commits."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -15,39 +15,72 @@ _queue: Queue = Queue()
 _worker_thread: threading.Thread | None = None
 _STOP = object()
 
+# LocationIQ allows 2 req/sec; spacing is measured start-to-start so the
+# request's own latency counts toward the interval
+_MIN_INTERVAL = 0.5
+_BATCH_SIZE = 20
+
+
+def _flush(pending: list[tuple[str, str, str]]) -> None:
+    """Write resolved addresses in one transaction (bulk UPDATE by primary key).
+
+    If the batch fails, each row is retried on its own so one bad row doesn't
+    throw away the other (already paid for) geocoding results.
+    """
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Attendance),
+            [{"id": attendance_id, field: address} for attendance_id, field, address in pending],
+        )
+        db.commit()
+        for attendance_id, field, address in pending:
+            logger.info(f"Updated attendance {attendance_id} {field} -> {address}")
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Batch DB update failed, retrying per row: {e}")
+        for attendance_id, field, address in pending:
+            try:
+                db.execute(update(Attendance), [{"id": attendance_id, field: address}])
+                db.commit()
+                logger.info(f"Updated attendance {attendance_id} {field} -> {address}")
+            except Exception as row_error:
+                db.rollback()
+                logger.error(f"DB update failed for attendance {attendance_id}: {row_error}")
+    finally:
+        db.close()
+        pending.clear()
+
 
 def _worker():
     """Drain the queue, resolve addresses, respect LocationIQ rate limit."""
+    next_slot = 0.0
+    # Resolved (attendance_id, field, address) rows waiting to be written;
+    # flushed once the queue runs dry or the batch is full
+    pending: list[tuple[str, str, str]] = []
     while True:
         task = _queue.get()
         if task is _STOP:
+            if pending:
+                _flush(pending)
             _queue.task_done()
             break
 
         attendance_id, latitude, longitude, is_punch_out = task
+        delay = next_slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        next_slot = time.monotonic() + _MIN_INTERVAL
         try:
             address = reverse_geocode(latitude, longitude)
             field = "punch_out_store" if is_punch_out else "punch_in_store"
-
-            db = SessionLocal()
-            try:
-                db.execute(
-                    update(Attendance)
-                    .where(Attendance.id == attendance_id)
-                    .values(**{field: address})
-                )
-                db.commit()
-                logger.info(f"Updated attendance {attendance_id} {field} -> {address}")
-            except Exception as e:
-                db.rollback()
-                logger.error(f"DB update failed for attendance {attendance_id}: {e}")
-            finally:
-                db.close()
+            pending.append((attendance_id, field, address))
         except Exception as e:
             logger.error(f"Geocoding failed for attendance {attendance_id}: {e}")
         finally:
+            if pending and (_queue.empty() or len(pending) >= _BATCH_SIZE):
+                _flush(pending)
             _queue.task_done()
-            time.sleep(0.5)  # Rate limit: 2 req/sec for LocationIQ
 
 
 def _ensure_worker():
@@ -1,23 +1,28 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from shared.constants import API_PREFIX, ROUTE_MAP
 
+# Full obfuscated path → full real path, so dispatch is a single dict lookup
+_REWRITES = {f"{API_PREFIX}/{code}": f"{API_PREFIX}/{name}" for code, name in ROUTE_MAP.items()}
 
-class RouteObfuscationMiddleware(BaseHTTPMiddleware):
+
+class RouteObfuscationMiddleware:
     """Rewrites obfuscated URLs to real route names.
 
     /api/1.1 → /api/login
     /api/1.2 → /api/register
+
+    Plain ASGI middleware: only the scope path is touched, so requests and
+    responses pass straight through without BaseHTTPMiddleware's wrapping.
     """
 
-    async def dispatch(self, request: Request, call_next):
-        path = request.scope["path"]
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        if path.startswith(API_PREFIX + "/"):
-            code = path[len(API_PREFIX) + 1:]
-            real_name = ROUTE_MAP.get(code)
-            if real_name:
-                request.scope["path"] = f"{API_PREFIX}/{real_name}"
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            real_path = _REWRITES.get(scope["path"])
+            if real_path:
+                scope["path"] = real_path
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
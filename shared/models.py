@@ -1,3 +1,5 @@
+import os
+import time
 import uuid
 from datetime import datetime
 
@@ -7,32 +9,47 @@ from sqlalchemy.dialects.postgresql import UUID
 
 from shared.database import Base
 
+# Naive UTC, matching what the application writes elsewhere
+_UTC_NOW = text("timezone('utc', now())")
+
+
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (RFC 9562 v7): 48-bit Unix ms timestamp + 74 random
+    bits. New primary keys land at the right edge of the btree instead of
+    on random pages."""
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return uuid.UUID(int=value)
+
 
 class Promoter(Base):
     __tablename__ = "promoters"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
     contact_number: Mapped[str] = mapped_column(String(15), nullable=False)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, nullable=False
+        DateTime, server_default=_UTC_NOW, nullable=False
     )
 
+    # passive_deletes: the FKs are ON DELETE CASCADE, so deleting a promoter
+    # leaves child rows to Postgres instead of loading and deleting each one
     attendance: Mapped[list["Attendance"]] = relationship(
-        back_populates="promoter", cascade="all, delete-orphan"
+        back_populates="promoter", cascade="all, delete-orphan", passive_deletes=True
     )
     refresh_tokens: Mapped[list["RefreshToken"]] = relationship(
-        back_populates="promoter", cascade="all, delete-orphan"
+        back_populates="promoter", cascade="all, delete-orphan", passive_deletes=True
     )
     daily_sales: Mapped[list["DailySale"]] = relationship(
-        back_populates="promoter", cascade="all, delete-orphan"
+        back_populates="promoter", cascade="all, delete-orphan", passive_deletes=True
     )
     daily_stock_summaries: Mapped[list["DailyStockSummary"]] = relationship(
-        back_populates="promoter", cascade="all, delete-orphan"
+        back_populates="promoter", cascade="all, delete-orphan", passive_deletes=True
     )
 
     __table_args__ = (
@@ -45,7 +62,7 @@ class Attendance(Base):
     __tablename__ = "attendance"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     promoter_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -70,9 +87,12 @@ class Attendance(Base):
         Index("idx_attendance_punch_in_time", "punch_in_timestamp"),
         Index("idx_attendance_punch_in_store", "punch_in_store"),
         Index("idx_attendance_promoter_date", "promoter_id", "punch_in_timestamp"),
+        # Open sessions only: serves "is this promoter punched in today"
+        # lookups and the nightly auto punch-out scan
         Index(
-            "idx_attendance_active_sessions",
-            "punch_out_timestamp",
+            "idx_attendance_active_by_promoter",
+            "promoter_id",
+            "punch_in_timestamp",
             postgresql_where=text("punch_out_timestamp IS NULL"),
         ),
     )
@@ -82,14 +102,14 @@ class PasswordResetOTP(Base):
     __tablename__ = "password_reset_otps"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     email: Mapped[str] = mapped_column(String(255), nullable=False)
     otp_hash: Mapped[str] = mapped_column(String(255), nullable=False)
     expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     is_used: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, nullable=False
+        DateTime, server_default=_UTC_NOW, nullable=False
     )
 
     __table_args__ = (
@@ -102,7 +122,7 @@ class Product(Base):
     __tablename__ = "products"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     sr_no: Mapped[int] = mapped_column(Integer, unique=True, nullable=False)
     mrp: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -112,7 +132,7 @@ class Product(Base):
     size_kg: Mapped[float] = mapped_column(Numeric(6, 3), nullable=False)
     gst_rate: Mapped[float] = mapped_column(Numeric(4, 2), nullable=False)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, nullable=False
+        DateTime, server_default=_UTC_NOW, nullable=False
     )
 
     __table_args__ = (
@@ -125,7 +145,7 @@ class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     promoter_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -136,13 +156,20 @@ class RefreshToken(Base):
     expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     is_revoked: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, nullable=False
+        DateTime, server_default=_UTC_NOW, nullable=False
     )
 
     promoter: Mapped["Promoter"] = relationship(back_populates="refresh_tokens")
 
     __table_args__ = (
-        Index("idx_refresh_promoter_active", "promoter_id", "is_revoked"),
+        # Live tokens only: serves the per-promoter delete on password reset
+        # and the nightly revoke sweep. Both filter with is_(False), so the
+        # predicate is spelled the same way.
+        Index(
+            "idx_refresh_live_promoter",
+            "promoter_id",
+            postgresql_where=text("is_revoked IS false"),
+        ),
         Index("idx_refresh_expires", "expires_at"),
     )
 
@@ -151,7 +178,7 @@ class DailySale(Base):
     __tablename__ = "daily_sales"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     attendance_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -167,7 +194,7 @@ class DailySale(Base):
     qty_sold: Mapped[int] = mapped_column(Integer, nullable=False)
     sold_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, nullable=False
+        DateTime, server_default=_UTC_NOW, nullable=False
     )
 
     promoter: Mapped["Promoter"] = relationship(back_populates="daily_sales")
@@ -184,7 +211,7 @@ class DailyStockSummary(Base):
     __tablename__ = "daily_stock_summary"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid7
     )
     attendance_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -202,7 +229,7 @@ class DailyStockSummary(Base):
     qty_sold: Mapped[int] = mapped_column(Integer, nullable=False)
     closing_stock: Mapped[int] = mapped_column(Integer, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, nullable=False
+        DateTime, server_default=_UTC_NOW, nullable=False
     )
 
     promoter: Mapped["Promoter"] = relationship(back_populates="daily_stock_summaries")
@@ -1,8 +1,8 @@
 from datetime import datetime, timezone, timedelta
 
-from sqlalchemy import update, delete
+from sqlalchemy import bindparam, delete, select, text, update
 
-from shared.database import SessionLocal
+from shared.database import engine
 from shared.models import Attendance, RefreshToken
 from shared.logger import get_logger
 
@@ -10,35 +10,111 @@ logger = get_logger("scheduler")
 
 IST = timezone(timedelta(hours=5, minutes=30))
 
+# Rows per transaction for the nightly sweep; keeps each lock set and WAL
+# burst bounded even after a backlog of unclosed sessions
+_NIGHTLY_CHUNK = 1000
+
+
+def _auto_punch_out_stmt(skip_locked: bool):
+    return (
+        update(Attendance)
+        .where(
+            Attendance.id.in_(
+                select(Attendance.id)
+                .where(Attendance.punch_out_timestamp.is_(None))
+                .limit(_NIGHTLY_CHUNK)
+                .with_for_update(skip_locked=skip_locked)
+            )
+        )
+        .values(
+            punch_out_timestamp=bindparam("now_utc"),
+            punch_out_store=bindparam("store"),
+        )
+    )
+
+
+def _revoke_tokens_stmt(skip_locked: bool):
+    return delete(RefreshToken).where(
+        RefreshToken.id.in_(
+            select(RefreshToken.id)
+            .where(RefreshToken.is_revoked.is_(False))
+            .limit(_NIGHTLY_CHUNK)
+            .with_for_update(skip_locked=skip_locked)
+        )
+    )
+
+
+# Built once; each run only binds the timestamp/label. The main pass skips
+# rows another transaction is holding (e.g. a geocoding flush or a
+# concurrent punch-out); the final pass then waits for those few stragglers
+# so every active session is still closed.
+_AUTO_PUNCH_OUT_STMT = _auto_punch_out_stmt(skip_locked=True)
+_AUTO_PUNCH_OUT_FINAL_STMT = _auto_punch_out_stmt(skip_locked=False)
+_REVOKE_TOKENS_STMT = _revoke_tokens_stmt(skip_locked=True)
+_REVOKE_TOKENS_FINAL_STMT = _revoke_tokens_stmt(skip_locked=False)
+
+# Session-level advisory lock so that, with several workers each running
+# their own scheduler, only one of them performs the nightly sweep
+_JOB_LOCK = text("SELECT pg_try_advisory_lock(hashtext('auto_punch_out'))")
+_JOB_UNLOCK = text("SELECT pg_advisory_unlock(hashtext('auto_punch_out'))")
+
+
+def _run_in_chunks(stmt, params: dict | None = None) -> int:
+    """Execute ``stmt`` in its own short transaction until it affects no rows."""
+    total = 0
+    while True:
+        # Plain Core transaction, no ORM session needed; commits on exit
+        with engine.begin() as conn:
+            affected = conn.execute(stmt, params or {}).rowcount
+        total += affected
+        if affected == 0:
+            return total
+
+
+def _sweep(stmt, final_stmt, label: str, params: dict | None = None) -> int:
+    """Skip-locked chunks first, then one waiting pass for the rows they skipped."""
+    total = _run_in_chunks(stmt, params)
+    stragglers = _run_in_chunks(final_stmt, params)
+    if stragglers:
+        logger.info(f"Auto punch-out: {stragglers} {label} were locked on the first pass")
+    return total + stragglers
+
 
 def auto_punch_out_and_revoke():
     """Run at 11 PM IST daily — punch out all active sessions and revoke all refresh tokens."""
     now_ist = datetime.now(IST)
     now_utc = now_ist.astimezone(timezone.utc).replace(tzinfo=None)
 
+    # Held on its own connection for the whole run; the chunks below commit
+    # on separate pooled connections
+    lock_conn = engine.connect()
+    try:
+        acquired = lock_conn.execute(_JOB_LOCK).scalar()
+        lock_conn.commit()
+    except Exception as e:
+        lock_conn.close()
+        logger.error(f"Auto punch-out failed to take job lock: {e}")
+        return
+    if not acquired:
+        lock_conn.close()
+        logger.info("Auto punch-out already running on another worker, skipping")
+        return
+
     logger.info(f"Running auto punch-out at {now_ist.strftime('%Y-%m-%d %H:%M:%S')} IST")
 
-    db = SessionLocal()
     try:
         # Punch out all active attendance records (no punch_out_timestamp)
-        result = db.execute(
-            update(Attendance)
-            .where(Attendance.punch_out_timestamp.is_(None))
-            .values(
-                punch_out_timestamp=now_utc,
-                punch_out_store="Auto punch-out (11 PM)",
-            )
+        punched_out = _sweep(
+            _AUTO_PUNCH_OUT_STMT,
+            _AUTO_PUNCH_OUT_FINAL_STMT,
+            "sessions",
+            {"now_utc": now_utc, "store": "Auto punch-out (11 PM)"},
         )
-        punched_out = result.rowcount
 
         # Delete all active refresh tokens
-        result = db.execute(
-            delete(RefreshToken)
-            .where(RefreshToken.is_revoked == False)
+        tokens_deleted = _sweep(
+            _REVOKE_TOKENS_STMT, _REVOKE_TOKENS_FINAL_STMT, "refresh tokens",
         )
-        tokens_deleted = result.rowcount
-
-        db.commit()
 
         logger.info(
             f"Auto punch-out complete: {punched_out} sessions closed, "
@@ -46,7 +122,16 @@ def auto_punch_out_and_revoke():
         )
 
     except Exception as e:
-        db.rollback()
         logger.error(f"Auto punch-out failed: {e}")
+
     finally:
-        db.close()
+        try:
+            lock_conn.execute(_JOB_UNLOCK)
+            lock_conn.commit()
+        except Exception as e:
+            # A session lock survives the return to the pool, so drop the
+            # connection rather than leave tomorrow's run locked out
+            logger.error(f"Auto punch-out failed to release job lock: {e}")
+            lock_conn.invalidate()
+        finally:
+            lock_conn.close()